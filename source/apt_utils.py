@@ -1,5 +1,3 @@
-import astropy
-import requests
 import json
 import os
 import subprocess
@@ -48,6 +46,8 @@ class AptUtils:
     def download_apt_aptx():
         """ Download and save the APT files
         """
+        import requests
+
         for pid in AptUtils.pid_list:
             outname = "{:d}.aptx".format(pid)
             outpath = AptUtils.apt_folder + outname
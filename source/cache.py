@@ -0,0 +1,69 @@
+#!/usr/bin/python
+import hashlib
+import glob
+import os
+import numpy as np
+
+
+class Cache:
+    """ Cache of parsed input files, held as compact NumPy (.npz) snapshots in
+    folder 'cache'.  Each snapshot is keyed by the parser which generated it and
+    a hash of the input file contents, so a file is only re-parsed after it has
+    been edited.
+    """
+    folder = '../cache/'
+    enabled = True              # False = Always parse input files from text
+    version = 1                 # Increment to invalidate snapshots when a parser changes
+
+    def __init__(self):
+        return
+
+    @staticmethod
+    def read(path, parser):
+        """ Return the dictionary of arrays generated by parser(path), reloading
+        it from the cache if the contents of the file are unchanged.
+        """
+        if not Cache.enabled:
+            return parser(path)
+        sha = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        name = os.path.splitext(os.path.basename(path))[0]
+        stem = "{:s}_{:s}_v{:d}_".format(name, parser.__name__.strip('_'), Cache.version)
+        cache_path = Cache.folder + stem + digest[0:16] + '.npz'
+        if os.path.exists(cache_path):
+            with np.load(cache_path, allow_pickle=False) as npz:
+                return {key: npz[key] for key in npz.files}
+
+        arrays = parser(path)
+        os.makedirs(Cache.folder, exist_ok=True)
+        for old_path in glob.glob(Cache.folder + stem + '*.npz'):    # Snapshots of old versions of file
+            if old_path != cache_path:
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:           # Already removed by another process
+                    pass
+        tmp_path = "{:s}.{:d}.tmp".format(cache_path, os.getpid())
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(tmp_path, cache_path)
+        return arrays
+
+    @staticmethod
+    def pack(token_lists):
+        """ Flatten a list of variable length token lists into a single token array
+        and an array of offsets, so they can be stored in a snapshot.
+        """
+        offsets = np.cumsum([0] + [len(tokens) for tokens in token_lists])
+        tokens = [token for token_list in token_lists for token in token_list]
+        return np.array(tokens, dtype=str), offsets
+
+    @staticmethod
+    def unpack(tokens, offsets):
+        """ Inverse of Cache.pack. """
+        token_lists = []
+        for i in range(0, len(offsets) - 1):
+            token_lists.append([str(token) for token in tokens[offsets[i]:offsets[i + 1]]])
+        return token_lists
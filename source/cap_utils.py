@@ -1,6 +1,9 @@
 from source.cap import Cap
 from car_utils import CarUtils
 from task import Task
+from cache import Cache
+from plan_context import PlanContext
+import numpy as np
 
 
 class CapUtils:
@@ -10,84 +13,94 @@ class CapUtils:
         """ Create CAPs from parameters in file 'caps.csv', with lists of input
         and output CARs linked from the passed list 'cars'.
         """
-        CapUtils.caps = self._read_caps()
+        ctx = PlanContext.current()
+        ctx.caps = self._read_caps()
+        ctx.closure_index = None            # Rebuilt for the new CAPs when needed
         return
 
     def _read_caps(self):
         path = '../inputs/caps.csv'
-        with open(path, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
-        n_lines = len(line_list)
+        registry = PlanContext.current().registry
+        registry.clear('CAP')
+        cap_table = Cache.read(path, CapUtils._parse_caps)
+        source_lists = Cache.unpack(cap_table['sources'], cap_table['source_offsets'])
         caps = []
-        for row in range(2, n_lines, 2):
-            cap_tokens = self._parse_line(line_list[row])
-            if len(cap_tokens) > 3:
-                idt_id, label, lead, colour = (token.strip() for token in cap_tokens[0:4])
-                source_tokens = self._parse_line(line_list[row + 1])
-                sources = []
-                for token in source_tokens[1:]:     # Add CARs and CAPs to source list
-                    search_id = token.strip()
-                    car, err_msg = CarUtils.get_car(search_id)
-                    if car is None:
-                        is_assigned = False
-                        for pre_cap in caps:
-                            if pre_cap.idt_id == token:
-                                sources.append(pre_cap)
-                                print('Cap_Utils._read_caps - Appending ' + pre_cap.__str__() + ' to ' + cap.__str__())
-                                is_assigned = True
-                        if not is_assigned:
-                            print(err_msg)
+        for cap_tokens, source_tokens in zip(cap_table['caps'], source_lists):
+            idt_id, label, lead, colour = (str(token) for token in cap_tokens)
+            sources = []
+            for token in source_tokens:         # Add CARs and CAPs to source list
+                search_id = token.strip()
+                car, err_msg = CarUtils.get_car(search_id)
+                if car is None:
+                    pre_cap, cap_err_msg = CapUtils.get_cap(token)
+                    if pre_cap is not None:
+                        sources.append(pre_cap)
+                        print('Cap_Utils._read_caps - Appending ' + pre_cap.__str__() + ' to ' + cap.__str__())
                     else:
-                        sources.append(car)
+                        print(err_msg)
+                else:
+                    sources.append(car)
 
-                cap = Cap(idt_id, label, colour, sources, lead)
-                print(cap)
-                caps.append(cap)
+            cap = Cap(idt_id, label, colour, sources, lead)
+            print(cap)
+            caps.append(cap)
+            registry.add(cap)
         return caps
 
+    @staticmethod
+    def _parse_caps(path):
+        """ Read the CAP parameters (idt_id, label, lead, colour) and the list of
+        source CAR/CAP identifiers for each CAP in 'caps.csv'.
+        """
+        from tools import Tools
+
+        cap_rows, source_lists = [], []
+        lines = Tools.read_lines(path, n_header_lines=2)
+        for line in lines:                      # CAP parameters, followed by a line of sources
+            source_line = next(lines, '')
+            cap_tokens = CapUtils._parse_line(line)
+            if len(cap_tokens) > 3:
+                cap_rows.append([token.strip() for token in cap_tokens[0:4]])
+                source_tokens = CapUtils._parse_line(source_line)
+                source_lists.append(source_tokens[1:])
+        sources, source_offsets = Cache.pack(source_lists)
+        cap_table = {'caps': np.array(cap_rows, dtype=str).reshape(-1, 4),
+                     'sources': sources, 'source_offsets': source_offsets}
+        return cap_table
+
     @staticmethod
     def get_cap(idt_id, **kwargs):
-        task_list = kwargs.get('cap_list', CapUtils.caps)
-        return Task._get_task(idt_id, task_list)
+        """ Find a CAP in the task registry, or in cap_list if specified. """
+        if 'cap_list' in kwargs:
+            return Task._get_task(idt_id, kwargs['cap_list'])
+        return PlanContext.current().registry.get(idt_id, 'CAP')
 
     @staticmethod
-    def connect_caps(caps):
+    def connect_caps(caps, conduit):
         """ Connect CAPs to their sources by generating a plottable 'loom'
         object.
         """
-        from conduit import Conduit
-        from loom import Loom
-
         for cap in caps:
-            cap.loom.construct()        # New test routine
+            cap.loom.construct(conduit)        # New test routine
         return
 
     @staticmethod
-    def layout_caps(caps):
-        from car_utils import CarUtils
-        from conduit import Conduit
-
+    def layout_caps(caps, conduit):
+        """ Set the start time of each CAP from its last input and position it
+        in the cell set by Layout.place. """
         for cap in caps:
-            # Find last input to this cap
-            last_task = None
             t_start_min = -999.0         # earliest start time (L + day)
             for task in cap.sources:
                 t_end = task.get_t_end()
                 if t_end > t_start_min:
                     t_start_min = t_end
-                    last_task = task
             cap.t_start = t_start_min
-            cap_row = last_task.row
-            start_col = Conduit.n_cols_list[0]
-
-#            print('Trying to place {:s} at row {:d}'.format(cap.idt_id, cap_row))
-            cap_col = Conduit.get_free_col(cap_row, start_col)
-            cap.row, cap.col = cap_row, cap_col
-            cap.set_position()
+            conduit.cell_occupation[cap.row, cap.col] = True
+            cap.set_position(conduit)
         return
 
-    def _parse_line(self, line):
+    @staticmethod
+    def _parse_line(line):
         """ Parse a line of comma delimited text into a token list, with
         trailing empty tokens removed.
         """
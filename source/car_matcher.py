@@ -0,0 +1,55 @@
+#!/usr/bin/python
+class CarMatcher:
+    """ Index of the MIRI CAR identifiers read from 'car_obs_table.csv', used to
+    pick out the MIRI CARs from the CAWG timeline.  Identifiers with '?' single
+    character wild cards are held in tables keyed by identifier length and wild
+    card positions, so that each timeline NG CAR id is resolved by a few dict
+    look-ups instead of a search through all identifiers.
+    """
+    wild_card = '?'
+
+    def __init__(self, miri_car_ids):
+        self.miri_car_ids = miri_car_ids
+        self.exact = {}             # ng_id: index of first matching row in miri_car_ids
+        self.wild = {}              # len(ng_id): {wild card positions: {ng_id: index}}
+        wc = CarMatcher.wild_card
+        for i, miri_car_id in enumerate(miri_car_ids):
+            miri_ng_id = str(miri_car_id[0])
+            if miri_ng_id.find(wc) == -1:
+                self.exact.setdefault(miri_ng_id, i)
+            else:
+                wc_idxs = tuple(j for j, char in enumerate(miri_ng_id) if char == wc)
+                masks = self.wild.setdefault(len(miri_ng_id), {})
+                masks.setdefault(wc_idxs, {}).setdefault(miri_ng_id, i)
+        return
+
+    def match(self, cawg_ng_id):
+        """ Find the first MIRI CAR identifier which matches a timeline NG CAR id.
+        :return: miri_ng_id, idt_id (with any wild cards replaced), miri_car_id
+        or None if this is not a MIRI CAR.
+        """
+        i = self.exact.get(cawg_ng_id, -1)
+        masks = self.wild.get(len(cawg_ng_id), {})
+        for wc_idxs, patterns in masks.items():
+            j = patterns.get(CarMatcher._mask(cawg_ng_id, wc_idxs), -1)
+            if j != -1 and (i == -1 or j < i):      # Keep the first match in table order
+                i = j
+        if i == -1:
+            return None
+        miri_car_id = self.miri_car_ids[i]
+        miri_ng_id, idt_id = str(miri_car_id[0]), str(miri_car_id[1])
+        wc = CarMatcher.wild_card
+        miri_ng_id_wc_idx = miri_ng_id.find(wc)
+        if miri_ng_id_wc_idx != -1:                 # Replace any wild card character
+            wc_char = cawg_ng_id[miri_ng_id_wc_idx]
+            miri_ng_id = miri_ng_id.replace(wc, wc_char)
+            idt_id = idt_id.replace(wc, wc_char)
+        return miri_ng_id, idt_id, miri_car_id
+
+    @staticmethod
+    def _mask(ng_id, wc_idxs):
+        """ Overwrite the characters at the wild card positions with '?' """
+        chars = list(ng_id)
+        for j in wc_idxs:
+            chars[j] = CarMatcher.wild_card
+        return ''.join(chars)
@@ -1,13 +1,40 @@
 from source.car import Car
 import numpy as np
 from task import Task
+from cache import Cache
+from plan_context import PlanContext
 
 
 class CarUtils:
 
-    cars = []
     ng_id_final = '838'
 
+    # Edits applied to the CAWG timeline by patch_cars
+    skip_rows = []          # eg [720] to skip row 720
+    ng_renames = {}         # eg {'74.4': '74.6'}
+    idt_renames = {'217.1': 'MIR-058.1', '217.2': 'MIR-058.2'}
+    removes = ['882.2', '76.2',
+               '774.1', '774.2', '774.4',                       # Non-MIRI parts of FGS-017
+               ]
+    durations = []
+    add_afters = []     # eg [(Car(-1, 'MIR-011.1', 'Phot zero pts.', 'Photometric zero points',
+                        #          '88.1', '1027', 'All',
+                        #          tstart=-1.0, tdur=1.0), 'MIR-076')]
+    # Add 13.2 days to align transition to State 4 with CAST for 8th March 2022
+    add_delays = [('MIR-042.6', 6.7), ('MIR-042.7', 1.5)]
+
+    combines = [('MIR-082',                     # Combined CAR name
+                 'MIR-082.1', 'MIR-082.2', 'MIR-082.3', 'MIR-082.4', 'MIR-082.5'),  # ..included
+                ('MIR-065',
+                 'MIR-065.1', 'MIR-065.2'),
+                ('MIR-ERO',
+                 'ERO-1.2', 'ERO-2.2', 'ERO-3.2', 'ERO-4.2', 'ERO-5.2', 'ERO-6.2')
+                ]
+    eros = [("ERO-1.1", "ERO 1 - MIR")]
+    patch_names = {'270.2': 'SIAF update conf.',
+                   '812.1': 'Sky bgd, hot', '812.2': 'Sky bgd, cold'}
+    tscale = {'min': 1, 'hr': 60.0, 'day': 60.0 * 24.0}     # Time units in minutes
+
     def __init__(self):
         return
 
@@ -18,67 +45,151 @@ class CarUtils:
         """
         path = '../inputs/car_obs_table.csv'
         print('Reading identifiers for MIRI related CARs from ' + path)
-        with open(path, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
+        miri_car_ids = Cache.read(path, CarUtils._parse_miri_car_ids)['miri_car_ids']
+        return miri_car_ids
+
+    @staticmethod
+    def _parse_miri_car_ids(path):
+        from tools import Tools
+
         miri_car_ids = []
-        for line in line_list[1:]:
+        for line in Tools.read_lines(path, n_header_lines=1):
             tokens = line.split(',')
             if len(tokens) > 3:
                 ng_id, idt_id, pid, obs_list, tag, title = (token.strip() for token in tokens[0:6])
                 miri_car_ids.append([ng_id, idt_id, pid, obs_list, tag, title])
-        return np.asarray(miri_car_ids)
+        return {'miri_car_ids': np.asarray(miri_car_ids, dtype=str).reshape(-1, 6)}
 
     @staticmethod
     def read_timeline(path):
-        from tools import Tools
-        import re
+        """ Read the CAWG timeline and create a Car object for each row which
+        matches a MIRI CAR identifier in 'car_obs_table.csv'.  The timeline is
+        first parsed into a structured array (one record per row), so that the
+        start times and durations of the matched rows can be decoded together.
+        """
+        from car_matcher import CarMatcher
+
+        timeline = Cache.read(path, CarUtils._parse_timeline)['timeline']
+        matcher = CarMatcher(CarUtils.read_miri_car_ids())
+
+        matches = []                            # (timeline index, miri ng id, idt id, miri_car_id)
+        for i, cawg_ng_id in enumerate(timeline['ng_id']):
+            match = matcher.match(str(cawg_ng_id))
+            if match is not None:
+                matches.append((i,) + match)
 
-        tools = Tools()
+        idx = np.array([match[0] for match in matches], dtype=int)
+        rows = timeline[idx]
+        tstarts = CarUtils._decode_times(rows['start'], rows['start_unit'], 'day')
+        tdurs_hr = CarUtils._decode_times(rows['dur'], rows['dur_unit'], 'hr')
 
         raw_car_list = []
-        miri_car_ids = CarUtils.read_miri_car_ids()
+        for j, match in enumerate(matches):
+            i, miri_ng_id, idt_id, miri_car_id = match
+            row = rows[j]
+            car = CarUtils._make_car(int(row['cawg_row']), str(row['title']), miri_ng_id, idt_id, miri_car_id,
+                                     float(tstarts[j]), float(tdurs_hr[j]))
+            raw_car_list.append(car)
+        return raw_car_list
+
+    @staticmethod
+    def stream_timeline(path, **kwargs):
+        """ Generator version of read_timeline, which reads the CAWG timeline line
+        by line (bypassing the cache) and yields a Car for each matched row, so
+        that very large timelines are never held in memory.  The Cars can be
+        passed straight on to patch_cars.  Times are decoded as in read_timeline
+        (NaN for blank or non-numeric cells).  The number of Cars yielded so far
+        is kept in stats['n_items'], where the optional 'stats' dictionary is
+        given (eg a Profiler stage record).
+        """
+        from car_matcher import CarMatcher
+
+        stats = kwargs.get('stats', {})
+        stats['n_items'] = 0
+        matcher = CarMatcher(CarUtils.read_miri_car_ids())
+        for record in CarUtils._iter_timeline(path):
+            cawg_row, cawg_ng_id, title, start, start_unit, dur, dur_unit = record
+            match = matcher.match(cawg_ng_id)
+            if match is not None:
+                miri_ng_id, idt_id, miri_car_id = match
+                tstart = CarUtils._decode_times(CarUtils._to_floats(np.array([start])), [start_unit], 'day')[0]
+                tdur_hr = CarUtils._decode_times(CarUtils._to_floats(np.array([dur])), [dur_unit], 'hr')[0]
+                stats['n_items'] += 1
+                yield CarUtils._make_car(cawg_row, title, miri_ng_id, idt_id, miri_car_id, tstart, tdur_hr)
+        return
+
+    @staticmethod
+    def _make_car(cawg_row, title, miri_ng_id, idt_id, miri_car_id, tstart, tdur_hr):
+        pid_id = miri_car_id[2]
+        apt_obs = miri_car_id[3]
+        label = miri_car_id[4]
+        car = Car(cawg_row, idt_id, label, title, miri_ng_id,
+                  pid_id, apt_obs,
+                  tstart=tstart, tdur_hr=tdur_hr)
+        return car
+
+    @staticmethod
+    def _iter_timeline(path):
+        """ Generator which yields the spreadsheet row number and the ng_id,
+        title, start, start unit, duration and duration unit tokens for each
+        row of the CAWG timeline.
+        """
+        from tools import Tools
 
-        with open(path, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
         n_header_lines = 3                      # Was 4 for June 2020
-        cawg_row = 4
-        for line in line_list[n_header_lines + 1:-1]:
+        cawg_row = n_header_lines + 1           # Spreadsheet row number
+        col_idxs = [0, 2, 3, 4, 5, 6]           # ng_id (index =1 for June 2020), title, start, unit, duration, unit
+        n_cols = col_idxs[-1] + 1
+        for line in Tools.read_lines(path, n_header_lines=n_header_lines + 1, drop_last=True):
             cawg_row += 1
-            line = tools.filter_strcom(line)    # Remove commas in strings
+            line = Tools.filter_strcom(line)    # Remove commas in strings
             token_list = line.split(',')
-            cawg_ng_id = token_list[0]          # Index =1 for June 2020
-
-            # Look for a matching miri CAR identifier, including wild card characters
-            for miri_car_id in miri_car_ids:
-                miri_ng_id = miri_car_id[0]
-                is_miri_car = miri_ng_id == cawg_ng_id
-                if miri_ng_id.find('?') != -1:
-                    re_string = miri_ng_id.replace('?', '.')    # Check for single character wildcard
-                    is_in_string = re.search(re_string, cawg_ng_id) is not None
-                    is_same_length = len(re_string) == len(cawg_ng_id)
-                    is_miri_car = is_in_string and is_same_length
-                if is_miri_car:
-                    idt_id = miri_car_id[1]
-                    # Replace any wild card character
-                    miri_ng_id_wc_idx = miri_ng_id.find('?')
-                    if miri_ng_id_wc_idx != -1:
-                        wc = cawg_ng_id[miri_ng_id_wc_idx]
-                        miri_ng_id = miri_ng_id.replace('?', wc)
-                        idt_id = idt_id.replace('?', wc)
-                    pid_id = miri_car_id[2]
-                    apt_obs = miri_car_id[3]
-                    label = miri_car_id[4]
-                    title = token_list[2]
-                    tstart = CarUtils._decode_time(token_list[3:5], 'day')
-                    tdur_hr = CarUtils._decode_time(token_list[5:7], 'hr')
-                    car = Car(cawg_row, idt_id, label, title, miri_ng_id,
-                              pid_id, apt_obs,
-                              tstart=tstart, tdur_hr=tdur_hr)
-                    raw_car_list.append(car)
-                    break
-        return raw_car_list
+            token_list += [''] * (n_cols - len(token_list))
+            yield (cawg_row,) + tuple(token_list[col_idx] for col_idx in col_idxs)
+        return
+
+    @staticmethod
+    def _parse_timeline(path):
+        """ Parse the CAWG timeline in a single pass into a NumPy structured array
+        with fields cawg_row, ng_id, title, start, start_unit, dur and dur_unit.
+        Times which can't be read as numbers (eg blank cells) are set to NaN.
+        """
+        columns = [], [], [], [], [], [], []
+        for record in CarUtils._iter_timeline(path):
+            for column, token in zip(columns, record):
+                column.append(token)
+        cawg_rows = np.array(columns[0], dtype='i4')
+        ng_ids, titles, starts, start_units, durs, dur_units = (np.array(column, dtype=str) for column in columns[1:])
+        n_rows = len(ng_ids)
+
+        dtype = [('cawg_row', 'i4'), ('ng_id', ng_ids.dtype), ('title', titles.dtype),
+                 ('start', 'f8'), ('start_unit', start_units.dtype),
+                 ('dur', 'f8'), ('dur_unit', dur_units.dtype)]
+        timeline = np.zeros(n_rows, dtype=dtype)
+        timeline['cawg_row'] = cawg_rows
+        timeline['ng_id'] = ng_ids
+        timeline['title'] = titles
+        timeline['start'] = CarUtils._to_floats(starts)
+        timeline['start_unit'] = start_units
+        timeline['dur'] = CarUtils._to_floats(durs)
+        timeline['dur_unit'] = dur_units
+        return {'timeline': timeline}
+
+    @staticmethod
+    def _to_floats(tokens):
+        """ Convert an array of numeric strings to floats, falling back to
+        token by token conversion (with NaN for bad values) only when needed.
+        """
+        try:
+            return tokens.astype(float)
+        except ValueError:
+            vals = np.full(len(tokens), np.nan)
+            for i, token in enumerate(tokens):
+                try:
+                    vals[i] = float(token)
+                except ValueError:
+                    pass
+            return vals
 
     @staticmethod
     def patch_cars(raw_car_list):
@@ -88,31 +199,77 @@ class CarUtils:
         and 713.  The instance at row 667 is renumbered to 74.6 and the IDT
         renamed MIRI-005.4 to MIR-005.6.  The instance at row 713 is skipped
         For June 2020, the skipped row is now 720.
+        raw_car_list can be any iterable of Cars, including the generator
+        returned by stream_timeline.
         :return:
         """
-        skip_rows = []          # eg [720] to skip row 720
-        ng_renames = {}         # eg {'74.4': '74.6'}
-        idt_renames = {'217.1': 'MIR-058.1', '217.2': 'MIR-058.2'}
-        removes = ['882.2', '76.2',
-                   '774.1', '774.2', '774.4',                       # Non-MIRI parts of FGS-017
-                  ]
-        durations = []
-        add_afters = [] #(Car(-1, 'MIR-011.1', 'Phot zero pts.', 'Photometric zero points',
-                        #   '88.1', '1027', 'All',
-                        #   tstart=-1.0, tdur=1.0), 'MIR-076')
-        # Add 13.2 days to align transition to State 4 with CAST for 8th March 2022
-        add_delays = [('MIR-042.6', 6.7), ('MIR-042.7', 1.5)]
-
-        combines = [('MIR-082',                     # Combined CAR name
-                     'MIR-082.1', 'MIR-082.2', 'MIR-082.3', 'MIR-082.4', 'MIR-082.5'),  # ..included
-                    ('MIR-065',
-                     'MIR-065.1', 'MIR-065.2'),
-                    ('MIR-ERO',
-                     'ERO-1.2', 'ERO-2.2', 'ERO-3.2', 'ERO-4.2', 'ERO-5.2', 'ERO-6.2')
-                    ]
-        eros = [("ERO-1.1", "ERO 1 - MIR")]
-        patch_names = {'270.2': 'SIAF update conf.',
-                       '812.1': 'Sky bgd, hot', '812.2': 'Sky bgd, cold'}
+        durations = CarUtils.durations
+        combines = CarUtils.combines
+        cawg_crs = []       # List of CAWG change requests
+        out_cars = list(CarUtils.iter_patched_cars(raw_car_list, cawg_crs))
+
+        # Update durations.
+        for car in out_cars:
+            cr_text = None
+            for duration in durations:        # Use primary/new CAR
+                if car.idt_id == duration[0]:
+                    old_t_dur_cawg = car.t_dur_cawg
+                    new_t_dur_cawg = duration[1]
+                    car.t_dur_cawg = new_t_dur_cawg
+                    fmt = "{:6d},{:>10s},CAR {:s}, change duration from {:10.2f} to {:10.2f} (hours)"
+                    cr_text = fmt.format(car.cawg_row, 'High', car.idt_id, old_t_dur_cawg, new_t_dur_cawg)
+                    cawg_crs.append(cr_text)
+            if cr_text is not None:
+                print(cr_text)
+
+        ctx = PlanContext.current()
+        registry = ctx.registry             # Index the patched CARs
+        registry.clear('CAR')
+        for car in out_cars:
+            registry.add(car)
+
+        # Combine (cooler assisted anneals) into a single CAR.
+        for car in out_cars:
+            for combine in combines:        # Use primary/new CAR
+                if car.idt_id == combine[1]:
+                    print('Combining CARs {:s} etc. into {:s}'.format(combine[1], combine[0]))
+                    new_idt_id = combine[0]
+                    prime_car, err_msg = registry.get(combine[1], 'CAR')
+                    for sec_idt_id in combine[2:]:
+                        sec_car, err_msg = registry.get(sec_idt_id, 'CAR')
+                        prime_car.t_dur += sec_car.t_dur
+                        out_cars.remove(sec_car)
+                        registry.remove(sec_car)
+                    registry.rename(prime_car, new_idt_id)
+
+        # Link all CARs (except the first) to their predecessor
+        for i in range(1, len(out_cars)):
+            out_cars[i].add_source(out_cars[i-1])
+        ctx.cars = out_cars
+
+        # Write CAWG change requests to a file
+        cr_file = open('../outputs/miri_cawg_crs', 'w')
+        fmt = "{:>6s},{:>10s},{:s}"
+        hdr = fmt.format('Row', 'Priority', 'Change')
+        cr_file.write(hdr + "\n")
+        for cr_text in cawg_crs:
+            cr_file.write(cr_text + "\n")
+        cr_file.close()
+        return
+
+    @staticmethod
+    def iter_patched_cars(raw_cars, cawg_crs):
+        """ Generator which applies the row by row CAWG timeline edits (skips,
+        renames, removals, insertions and delays) to a stream of raw Cars,
+        yielding the patched Cars and appending change requests to cawg_crs.
+        """
+        ng_renames = CarUtils.ng_renames
+        idt_renames = CarUtils.idt_renames
+        removes = CarUtils.removes
+        add_afters = CarUtils.add_afters
+        add_delays = CarUtils.add_delays
+        eros = CarUtils.eros
+        patch_names = CarUtils.patch_names
         print('')
         print('Note that the following edits are performed on the CAWG timeline')
         fmt = ",{:<10s},{:<12s},{:<20s},{:<s}"
@@ -120,11 +277,10 @@ class CarUtils:
         fmt_rec = " {:<6d}" + fmt
         print(fmt_hdr.format('Row', 'Priority', 'CAR ID', 'CAR Label', 'Change'))
 
-        cawg_crs = []       # List of CAWG change requests
-        out_cars = []
         t_delay = 0.0       # Delay to add to start time of all CARs (incremented by add_delays)
-        for car in raw_car_list:
+        for car in raw_cars:
             cr_text = None
+            out_cars = []   # Patched CARs generated from this raw CAR
             skip_ga = 'analysis' in car.title.lower()   # Reject all analysis
             skip_cam = 'CAM' in car.title               # Match case for rejecting CAM meetings.
             skip = skip_ga or skip_cam
@@ -189,57 +345,20 @@ class CarUtils:
 
             if cr_text is not None:
                 print(cr_text)
-
-        # Update durations.
-        for car in out_cars:
-            cr_text = None
-            for duration in durations:        # Use primary/new CAR
-                if car.idt_id == duration[0]:
-                    old_t_dur_cawg = car.t_dur_cawg
-                    new_t_dur_cawg = duration[1]
-                    car.t_dur_cawg = new_t_dur_cawg
-                    fmt = "{:6d},{:>10s},CAR {:s}, change duration from {:10.2f} to {:10.2f} (hours)"
-                    cr_text = fmt.format(car.cawg_row, 'High', car.idt_id, old_t_dur_cawg, new_t_dur_cawg)
-                    cawg_crs.append(cr_text)
-            if cr_text is not None:
-                print(cr_text)
-
-        # Combine (cooler assisted anneals) into a single CAR.
-        for car in out_cars:
-            for combine in combines:        # Use primary/new CAR
-                if car.idt_id == combine[1]:
-                    print('Combining CARs {:s} etc. into {:s}'.format(combine[1], combine[0]))
-                    new_idt_id = combine[0]
-                    prime_car, err_msg = CarUtils.get_car(combine[1], car_list=out_cars)
-                    for sec_idt_id in combine[2:]:
-                        sec_car, err_msg = CarUtils.get_car(sec_idt_id, car_list=out_cars)
-                        prime_car.t_dur += sec_car.t_dur
-                        out_cars.remove(sec_car)
-                    prime_car.idt_id = new_idt_id
-
-        # Link all CARs (except the first) to their predecessor
-        for i in range(1, len(out_cars)):
-            out_cars[i].add_source(out_cars[i-1])
-        CarUtils.cars = out_cars
-
-        # Write CAWG change requests to a file
-        cr_file = open('../outputs/miri_cawg_crs', 'w')
-        fmt = "{:>6s},{:>10s},{:s}"
-        hdr = fmt.format('Row', 'Priority', 'Change')
-        cr_file.write(hdr + "\n")
-        for cr_text in cawg_crs:
-            cr_file.write(cr_text + "\n")
-        cr_file.close()
+            for out_car in out_cars:
+                yield out_car
         return
 
     @staticmethod
     def get_car(idt_id, **kwargs):
-        task_list = kwargs.get('car_list', CarUtils.cars)
-        return Task._get_task(idt_id, task_list)
+        """ Find a CAR in the task registry, or in car_list if specified. """
+        if 'car_list' in kwargs:
+            return Task._get_task(idt_id, kwargs['car_list'])
+        return PlanContext.current().registry.get(idt_id, 'CAR')
 
     @staticmethod
     def print():
-        cars = CarUtils.cars
+        cars = PlanContext.current().cars
         cars[0].print_header()
         for car in cars:
             car.print()
@@ -259,47 +378,25 @@ class CarUtils:
         return car_list
 
     @staticmethod
-    def _decode_time(time, op_unit):
-        tscale = {'min': 1, 'hr': 60.0, 'day': 60.0 * 24.0}
-        val = float(time[0])
-        in_scale = tscale[time[1]]
-        out_scale = tscale[op_unit]
-        t = val * in_scale / out_scale
+    def _decode_times(vals, units, op_unit):
+        """ Convert arrays of time values and their units ('min', 'hr' or 'day') to
+        times in op_unit.
+        """
+        tscale = CarUtils.tscale
+        unit_list, unit_idxs = np.unique(units, return_inverse=True)
+        in_scales = np.array([tscale[unit] for unit in unit_list], dtype=float)
+        t = vals * in_scales[unit_idxs] / tscale[op_unit]
         return t
 
     @staticmethod
     def add_apt_times_to_cars(cars, car_obs_file, apt_data_file):
 
-        with open(car_obs_file, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
-        n_header_lines = 1
+        car_obs = Cache.read(car_obs_file, CarUtils._parse_car_obs)
         cpos_table = []
-        for line in line_list[n_header_lines:-1]:
-            tokens = line.split(',')
-            car_instance = tokens[1].strip()
-            pid = tokens[2].strip()
-            if pid != 'RTC' and pid != 'TBD':
-                obs_text = tokens[3]
-                ots = obs_text.split('.')
-                obs_list = []
-                for ot in ots:
-                    obs_list.append(ot)
-                cpos_table.append((car_instance, pid, obs_list))
-
-        with open(apt_data_file, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
-        n_header_lines = 1
-        apt_obs_table = []
-        for line in line_list[n_header_lines:-1]:
-            tokens = line.split(',')
-            apt_car_id = tokens[0].strip()
-            apt_pid = tokens[1].strip()
-            apt_obs = tokens[6].strip()
-            apt_obs_t_sci = float(tokens[32]) / 3600.0
-            apt_obs_t_dur = float(tokens[33]) / 3600.0
-            apt_obs_table.append((apt_car_id, apt_pid, apt_obs, apt_obs_t_sci, apt_obs_t_dur))
+        for car_instance, pid, obs_text in zip(car_obs['car_instance'], car_obs['pid'], car_obs['obs_text']):
+            cpos_table.append((str(car_instance), str(pid), str(obs_text).split('.')))
+
+        apt_index = CarUtils._index_apt_obs(Cache.read(apt_data_file, CarUtils._parse_apt_data))
 
         car_times_file = '../outputs/car_times.csv'
         csv_file = open(car_times_file, 'w')
@@ -320,31 +417,20 @@ class CarUtils:
                 nob = 1
             car.obs_list = []
             car.t_sci_apt, car.t_dur_apt = 0.0, 0.0
-            handled_obs_list = []
+            cpos_car_id = cpos_car_inst.split('.')[0]
+            apt_car_obs = apt_index.get(cpos_car_id, None)
             obs_text = ''
-            for apt in apt_obs_table:
-                apt_car_id, apt_pid, apt_obs, apt_obs_t_sci, apt_obs_t_dur = apt
-                tokens = cpos_car_inst.split('.')
-                cpos_car_id = tokens[0]
-                is_car = apt_car_id == cpos_car_id
-                if is_car:
-                    obs_text = ''
-                    for cpos_obs in cpos_obs_list:
-                        obs_text = obs_text + cpos_obs + '-'
-                        is_all = True if cpos_obs == 'All' else False
-                        is_obs = False
-                        if not is_all:
-                            is_obs = True if apt_obs == cpos_obs else False
-                        if is_all or is_obs:
-                            is_handled = False
-                            for handled_obs in handled_obs_list:
-                                if handled_obs == apt_obs:
-                                    is_handled = True
-                            if not is_handled:
-                                car.t_sci_apt += apt_obs_t_sci
-                                car.t_dur_apt += apt_obs_t_dur
-                                car.obs_list.append((apt_obs, apt_obs_t_dur))
-                                handled_obs_list.append(apt_obs)
+            if apt_car_obs is not None:
+                obs_text = '-'.join(cpos_obs_list) + '-'
+                if 'All' in cpos_obs_list:
+                    apt_obs_list = apt_car_obs.values()
+                else:                                   # Requested observations, in APT table order
+                    apt_obs_list = [apt_car_obs[obs] for obs in set(cpos_obs_list) if obs in apt_car_obs]
+                    apt_obs_list.sort()
+                for apt_row, apt_obs, apt_obs_t_sci, apt_obs_t_dur in apt_obs_list:
+                    car.t_sci_apt += apt_obs_t_sci
+                    car.t_dur_apt += apt_obs_t_dur
+                    car.obs_list.append((apt_obs, apt_obs_t_dur))
             t_sci_apt_tot += car.t_sci_apt
             t_dur_apt_tot += car.t_dur_apt
             t_dur_cawg_tot += car.t_dur_cawg
@@ -358,6 +444,61 @@ class CarUtils:
         csv_file.close()
         return cars
 
+    @staticmethod
+    def _parse_car_obs(car_obs_file):
+        """ Read the CAR instance, PID and observation list text for the APT
+        driven CARs (ie not RTC or TBD) in 'car_obs_table.csv'.
+        """
+        from tools import Tools
+
+        car_instances, pids, obs_texts = [], [], []
+        for line in Tools.read_lines(car_obs_file, n_header_lines=1, drop_last=True):
+            tokens = line.split(',')
+            car_instance = tokens[1].strip()
+            pid = tokens[2].strip()
+            if pid != 'RTC' and pid != 'TBD':
+                car_instances.append(car_instance)
+                pids.append(pid)
+                obs_texts.append(tokens[3])
+        car_obs = {'car_instance': np.array(car_instances, dtype=str),
+                   'pid': np.array(pids, dtype=str),
+                   'obs_text': np.array(obs_texts, dtype=str)}
+        return car_obs
+
+    @staticmethod
+    def _parse_apt_data(apt_data_file):
+        """ Read the CAR id, observation number and science and total durations
+        (in hours) for all observations in the APT decoder data file.
+        """
+        from tools import Tools
+
+        car_ids, obs, t_scis, t_durs = [], [], [], []
+        for line in Tools.read_lines(apt_data_file, n_header_lines=1, drop_last=True):
+            tokens = line.split(',')
+            car_ids.append(tokens[0].strip())
+            obs.append(tokens[6].strip())
+            t_scis.append(float(tokens[32]) / 3600.0)
+            t_durs.append(float(tokens[33]) / 3600.0)
+        apt_data = {'car_id': np.array(car_ids, dtype=str), 'obs': np.array(obs, dtype=str),
+                    't_sci': np.array(t_scis, dtype=float), 't_dur': np.array(t_durs, dtype=float)}
+        return apt_data
+
+    @staticmethod
+    def _index_apt_obs(apt_data):
+        """ Index the APT decoder data by CAR id, holding a dictionary of the
+        observations for that CAR keyed by observation number.  Only the first
+        entry for each (CAR, observation) is kept.
+        :return: apt_index {car_id: {obs: (apt_row, obs, t_sci/hr, t_dur/hr)}}
+        """
+        apt_index = {}
+        apt_rows = zip(apt_data['car_id'].tolist(), apt_data['obs'].tolist(),
+                       apt_data['t_sci'].tolist(), apt_data['t_dur'].tolist())
+        for apt_row, (apt_car_id, apt_obs, apt_obs_t_sci, apt_obs_t_dur) in enumerate(apt_rows):
+            apt_car_obs = apt_index.setdefault(apt_car_id, {})
+            if apt_obs not in apt_car_obs:
+                apt_car_obs[apt_obs] = apt_row, apt_obs, apt_obs_t_sci, apt_obs_t_dur
+        return apt_index
+
     @staticmethod
     def add_caps_to_cars(cars, caps):
         for car in cars:
@@ -372,26 +513,23 @@ class CarUtils:
         return cars
 
     @staticmethod
-    def set_positions(cars):
+    def set_positions(cars, conduit):
         for car in cars:
-            car.set_position()
+            car.set_position(conduit)
         return
 
     @staticmethod
-    def layout_cars(cars, n_car_cols, **kwargs):
-
+    def layout_cars(cars, n_car_cols):
+        """ Place the CARs in rows of n_car_cols cells, left to right and top to
+        bottom, in list order.
+        :return: number of rows used
+        """
         car_start_col = 0
 
-        nominal_car_breaks = ['MIR-004', 'MIR-007', 'MIR-018']
-        car_breaks = kwargs.get('car_breaks', nominal_car_breaks)
-
         row, col = 0, 0
         for car in cars:
             car.row, car.col = row, col
             col += 1
-            for car_break in car_breaks:
-                if car.idt_id == car_break:
-                    col = n_car_cols
             if col == n_car_cols:
                 col = car_start_col
                 row = row + 1
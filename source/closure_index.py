@@ -0,0 +1,68 @@
+#!/usr/bin/python
+import numpy as np
+
+
+class ClosureIndex:
+    """ Index of the upstream (source) CARs and CAPs of every CAP in the plan,
+    built once by walking the CAP source trees.  Each CAP's closure is held as a
+    pair of index arrays into the plan's CAR and CAP lists, in the order in which
+    the tasks are first reached (depth first), with tasks which share an idt_id
+    included once.  The subgraph which feeds a KDP is then the union of the
+    closures of its source CAPs.
+    """
+    def __init__(self, cars, caps):
+        self.cars, self.caps = cars, caps
+        self.car_idxs = {id(car): i for i, car in enumerate(cars)}     # Position of each task in its list
+        self.cap_idxs = {id(cap): i for i, cap in enumerate(caps)}
+        self.closures = {}          # {id(cap): (car_idxs, cap_idxs)}
+        for cap in caps:
+            self.get_closure(cap)
+        return
+
+    def get_closure(self, cap):
+        """ Get the upstream CARs and CAPs of a CAP.
+        :return: car_idxs, cap_idxs - index arrays into the CAR and CAP lists
+        """
+        closure = self.closures.get(id(cap), None)
+        if closure is not None:
+            return closure
+        car_idxs, cap_idxs = [], []
+        for task in cap.sources:
+            if task.type == 'CAR':
+                car_idxs.append(self.car_idxs[id(task)])
+            else:
+                cap_idxs.append(self.cap_idxs[id(task)])
+                src_car_idxs, src_cap_idxs = self.get_closure(task)
+                car_idxs.extend(src_car_idxs)
+                cap_idxs.extend(src_cap_idxs)
+        closure = self._unique(car_idxs, self.cars), self._unique(cap_idxs, self.caps)
+        self.closures[id(cap)] = closure
+        return closure
+
+    def select(self, kdp):
+        """ Select the CAPs and CARs which flow data to a KDP, with the CARs
+        sorted by start time (CARs which start together keep their order) and
+        the CAPs in plan order, so that each CAP follows its source CAPs.
+        """
+        car_idxs, cap_idxs = [], []
+        for cap in kdp.sources:
+            cap_idxs.append(self.cap_idxs[id(cap)])
+            src_car_idxs, src_cap_idxs = self.get_closure(cap)
+            car_idxs.extend(src_car_idxs)
+            cap_idxs.extend(src_cap_idxs)
+        car_idxs = self._unique(car_idxs, self.cars)
+        cap_idxs = self._unique(cap_idxs, self.caps)
+
+        t_starts = np.array([self.cars[i].t_start for i in car_idxs])
+        car_idxs = car_idxs[np.argsort(t_starts, kind='stable')]
+        cars = [self.cars[i] for i in car_idxs]
+        caps = [self.caps[i] for i in np.sort(cap_idxs)]
+        return cars, caps
+
+    @staticmethod
+    def _unique(idxs, tasks):
+        """ Remove repeated tasks (matched by idt_id), keeping the first. """
+        first_idxs = {}
+        for i in idxs:
+            first_idxs.setdefault(tasks[i].idt_id, i)
+        return np.array(list(first_idxs.values()), dtype=np.int32)
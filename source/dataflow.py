@@ -1,68 +1,183 @@
-class DataFlow:
+import hashlib
+import json
+import os
+
 
+class DataFlow:
 
-    cols_list = [(6, 5, 3), (3, 2, 1), (3, 3, 2),
-                 (2, 2, 1), (2, 3, 1), (4, 6, 2)]
-    col_dict = {'All': 0, 'M-1': 2, 'M-2': 1, 'M-3': 1, 'M-4': 2,
-                'M-5': 3, 'M-6': 3, 'M-7': 4, 'M-EOC': 4}
+    path_format = '../outputs/dataflow_{:s}.{:s}'
+    formats = ['png', 'svg', 'pdf']
+    preview_pixels_per_task = 40000         # Image size for previews (dpi chosen from number of tasks)
+    min_dpi, max_dpi = 10.0, 100.0
+    render_rate = 0.1                       # Estimated time to render a PNG (sec/megapixel)
+    manifest_path = '../outputs/dataflow_manifest.json'   # Fingerprints of the plotted diagrams
+    version = 2                 # Increment to replot all diagrams after a change to the plotting code
+    xy_origin = [100.0, 1600.0]             # Top left of the grid of cells
+    margin = 50.0                           # Space around the grid
+    units_per_inch = 30.0                   # Figure scale, so text and boxes look the same in all diagrams
+    fig_pad = 4.0                           # Space for title and axis labels (inches)
+    max_pixels = 65000                      # Largest PNG width or height (Agg limit is 2^16)
 
     def __init__(self, **kwargs):
         return
 
+    @staticmethod
+    def get_diagram_ids(kdps):
+        """ List the diagrams to plot, 'All' then one for each KDP. """
+        kdp_ids = []
+        for kdp in kdps:
+            if kdp.idt_id not in kdp_ids:
+                kdp_ids.append(kdp.idt_id)
+        return ['All'] + kdp_ids
+
+    @staticmethod
+    def get_plot_name(diagram_id, **kwargs):
+        """ Name of the diagram file and its manifest entry, with a '_preview'
+        suffix for previews so they don't replace the full resolution plots. """
+        return diagram_id + '_preview' if kwargs.get('preview', False) else diagram_id
+
+    @staticmethod
+    def plot_dataflows(cawg_date, kdp_ids, **kwargs):
+        """ Plot the dataflow diagrams for a list of KDPs in parallel, using a
+        pool of n_workers processes (other keywords are passed to plot_dataflow).  Each worker plots one diagram, starting
+        from its own copy of the current plan (tasks, sockets and looms), so
+        the diagrams do not depend on the order in which they are plotted.
+        :return: {plot name: fingerprint} for the plotted diagrams
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        import pickle
+        from plan_context import PlanContext
+        from profiler import Profiler
+
+        n_workers = kwargs.pop('n_workers', None)
+        snapshot = pickle.dumps(PlanContext.current())
+        fingerprints = {}
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(DataFlow._plot_worker, snapshot, cawg_date, kdp_id, Profiler.enabled, kwargs)
+                       for kdp_id in kdp_ids]
+            for kdp_id, future in zip(kdp_ids, futures):
+                plot_name = DataFlow.get_plot_name(kdp_id, **kwargs)
+                fingerprints[plot_name], figures = future.result()     # Re-raises any exception in the worker
+                Profiler.add_figures(figures)
+                print('Plotted ' + kdp_id)
+        return fingerprints
+
+    @staticmethod
+    def _plot_worker(snapshot, cawg_date, kdp_id, profile, kwargs):
+        """ Worker task.  Plot one diagram using an unpickled copy of the plan.
+        :return: fingerprint, figures logged by the Profiler (if profile=True)
+        """
+        import pickle
+        from profiler import Profiler
+
+        Profiler.enabled = profile
+        ctx = pickle.loads(snapshot)
+        with ctx, Profiler.stage('plot_dataflow_' + kdp_id):
+            fingerprint = DataFlow.plot_dataflow(ctx.cars, ctx.caps, ctx.kdps, cawg_date,
+                                                 kdp_id=kdp_id, **kwargs)
+            figures = Profiler.get_figures()
+        return fingerprint, figures
+
     @staticmethod
     def plot_dataflow(cars, caps, kdps, cawg_date, **kwargs):
-        from plot_utils import Plot
+        """ Plot the dataflow diagram for one KDP (or 'All').  If a manifest is
+        passed and its entry for this diagram matches the fingerprint of the
+        diagram's tasks, the existing plot is kept.  Output options are,
+            fmt = 'png' (default), 'svg' or 'pdf'
+            dpi = PNG resolution (default is the figure dpi, or set from the
+                  number of tasks if preview=True)
+            time_budget = Maximum (estimated) time to render a PNG (sec), the
+                  resolution is reduced to fit.
+        A Conduit passed as 'conduit' is reset and reused for the diagram's grid.
+        :return: fingerprint of the diagram
+        """
         from car_utils import CarUtils
         from cap_utils import CapUtils
+        from layout import Layout
         from kdp_utils import KdpUtils
-        from task import Task
         from conduit import Conduit
-        from key import Key
-
-        plot = Plot()
 
         tgt_kdp_id = kwargs.get('kdp_id', 'All')
+        manifest = kwargs.get('manifest', {})
+        fmt = kwargs.get('fmt', 'png')
+        options = [fmt, kwargs.get('dpi', None), kwargs.get('preview', False), kwargs.get('time_budget', None)]
 
-        xlim = [50, 1300]        # Fixed for 'All' case to keep font size looking ok,
-        ylim = [300,  1700]
-        xy_origin = [xlim[0] + 50, ylim[1] - 100]
-
-        # End of row CARS for 'All' case
-        car_breaks = ['MIR-007', 'MIR-064.1', 'MIR-056', 'MIR-058.2', 'MIR-077']
-
-        idx = DataFlow.col_dict[tgt_kdp_id]
-        cols = DataFlow.cols_list[idx]
         plot_key = True
         if tgt_kdp_id != 'All':
             plot_key = False
             tgt_kdp = None
-            car_breaks = []
             for kdp in kdps:
                 if kdp.idt_id == tgt_kdp_id and tgt_kdp == None:
                     tgt_kdp = kdp
             cars, caps = DataFlow._filter_tasks(tgt_kdp)
             kdps = [tgt_kdp]
+        else:
+            cars[0].sources = []            # Undo the CAR links set by _filter_tasks
+            for i in range(1, len(cars)):
+                cars[i].sources = [cars[i-1]]
 
-        n_car_cols, n_cap_cols, n_kdp_cols = cols
-        n_rows = CarUtils.layout_cars(cars, n_car_cols, car_breaks=car_breaks)
-        Conduit(xy_origin, n_rows, (n_car_cols, n_cap_cols, n_kdp_cols))
-        Conduit.build_cells()
+        plot_name = DataFlow.get_plot_name(tgt_kdp_id, **kwargs)
+        path = DataFlow.path_format.format(plot_name, fmt)
+        fingerprint = DataFlow._get_fingerprint(cars, caps, kdps, cawg_date, plot_key, options)
+        if manifest.get(plot_name, None) == fingerprint and os.path.exists(path):
+            print('Dataflow diagram {:s} is unchanged'.format(tgt_kdp_id))
+            return fingerprint
 
-        CarUtils.set_positions(cars)
+        for task in cars + caps + kdps:     # Start with free sockets, so the plot only depends on its tasks
+            task.setup_sockets()
+        n_rows, n_cols_list = Layout.place(cars, caps, kdps)
+        conduit = kwargs.pop('conduit', None)
+        if conduit is None:
+            conduit = Conduit(DataFlow.xy_origin, n_rows, n_cols_list)
+        else:
+            conduit.reset(n_rows, n_cols_list)
+        conduit.build_cells()
 
-        CapUtils.layout_caps(caps)
-        CapUtils.connect_caps(caps)
+        CarUtils.set_positions(cars, conduit)
 
-        KdpUtils.layout_kdps(kdps)
-        KdpUtils.connect_kdps(kdps)
+        CapUtils.layout_caps(caps, conduit)
+        CapUtils.connect_caps(caps, conduit)
 
+        KdpUtils.layout_kdps(kdps, conduit)
+        KdpUtils.connect_kdps(kdps, conduit)
+
+        DataFlow._plot_diagram(cars, caps, kdps, conduit, tgt_kdp_id, plot_key, path, **kwargs)
+        return fingerprint
+
+    @staticmethod
+    def _get_limits(conduit, plot_key):
+        """ Get the axis limits which hold the grid of cells, with the key
+        (if plotted) to the right of the grid.
+        """
+        from key import Key
+
+        margin = DataFlow.margin
+        xmin, xmax, ymin, ymax = conduit.get_bounds()
+        if plot_key:
+            xmax += margin + Key.width
+            ymin = min(ymin, ymax - Key.get_height())
+        xlim = [xmin - margin, xmax + margin]
+        ylim = [ymin - margin, ymax + margin]
+        return xlim, ylim
+
+    @staticmethod
+    def _plot_diagram(cars, caps, kdps, conduit, tgt_kdp_id, plot_key, path, **kwargs):
+        from plot_utils import Plot
+        from loom import Loom
+        from profiler import Profiler
+        from key import Key
+
+        xlim, ylim = DataFlow._get_limits(conduit, plot_key)
+        scale, pad = DataFlow.units_per_inch, DataFlow.fig_pad
+        figsize = [(xlim[1] - xlim[0]) / scale + pad, (ylim[1] - ylim[0]) / scale + pad]
+        plot = Plot()
         fig, axs = plot.set_plot_area('MIRI CAR/CAP Flow',
                                       xlim=xlim, ylim=ylim, aspect='equal',
-                                      fontsize=10)
+                                      fontsize=10, figsize=figsize)
         ax = axs[0, 0]
         plot_grid = kwargs.get('plot_grid', False)
         if plot_grid:
-            Conduit.plot_grid(ax)
+            conduit.plot_grid(ax)
 
         for car in cars:
             car.plot_box(ax, tl_text=car.ng_id)
@@ -70,79 +185,101 @@ class DataFlow:
 
         for cap in caps:
             cap.plot_box(ax, tl_text=cap.lead)
-            cap.loom.plot(ax)
 
         for kdp in kdps:
             kdp.plot_box(ax)
-            kdp.loom.plot(ax)
+        Loom.plot_looms(ax, [task.loom for task in caps + kdps])
 
         if plot_key:
             key = Key()
-            x_key = 0.5 * (xlim[0] + xlim[1])
-            y_key = Conduit.xy_origin[1]
+            xmin, xmax, ymin, ymax = conduit.get_bounds()
+            x_key = xmax + DataFlow.margin
+            y_key = ymax
 
             key.plot(ax, x_key, y_key)
-        fig.savefig('../outputs/dataflow_' + tgt_kdp_id + '.png')
-        plot.clear()
+        Profiler.record_figure(fig, name='dataflow_' + tgt_kdp_id)
+        n_tasks = len(cars) + len(caps) + len(kdps)
+        DataFlow._save_figure(fig, path, n_tasks, **kwargs)
+        plot.clear(fig)
         return
 
     @staticmethod
-    def _get_source_cars(cap, cars, caps):
-        """ Append cars in this CAPs source tree to the passed list. """
-        for task in cap.sources:
-            if task.type == 'CAR':
-                cars.append(task)
-            else:
-                caps.append(task)
-                cars, caps = DataFlow._get_source_cars(task, cars, caps)
-        return cars, caps
+    def _save_figure(fig, path, n_tasks, **kwargs):
+        """ Save a diagram as a vector (svg, pdf) file, or as a PNG with the
+        resolution set by the dpi, preview and time_budget options.  The time
+        to render is estimated from the fixed render_rate, so the resolution
+        (and the file) depends only on the options and the diagram.
+        """
+        fmt = kwargs.get('fmt', 'png')
+        if fmt != 'png':
+            fig.savefig(path, format=fmt)
+            return
+        w, h = fig.get_size_inches()
+        area = w * h                                        # sq. inches
+        dpi = kwargs.get('dpi', None)
+        time_budget = kwargs.get('time_budget', None)
+        if dpi is None:
+            dpi = fig.dpi
+            if kwargs.get('preview', False):                # Image size proportional to number of tasks
+                dpi = (n_tasks * DataFlow.preview_pixels_per_task / area) ** 0.5
+                dpi = min(max(dpi, DataFlow.min_dpi), DataFlow.max_dpi)
+        if time_budget is not None:                         # Reduce resolution to render within budget
+            budget_dpi = (1.0E6 * time_budget / (DataFlow.render_rate * area)) ** 0.5
+            dpi = dpi if dpi < budget_dpi else max(budget_dpi, DataFlow.min_dpi)
+        dpi = min(dpi, DataFlow.max_pixels / max(w, h))
+
+        fig.savefig(path, dpi=dpi)
+        return
+
+    @staticmethod
+    def _get_fingerprint(cars, caps, kdps, cawg_date, plot_key, options):
+        """ Hash of everything which is drawn in a diagram; the identifiers,
+        labels, start times, durations and PIDs of the tasks, the links between
+        them, the layout parameters and the output options.
+        """
+        from key import Key
+        from layout import Layout
+
+        items = [DataFlow.version, cawg_date, Layout.car_aspect, Layout.max_car_cols, options]
+        for car in cars:
+            items.append([car.type, car.idt_id, car.ng_id, car.label, car.pid_id,
+                          repr(car.t_start), repr(car.t_dur), [source.idt_id for source in car.sources]])
+        for task in caps + kdps:
+            items.append([task.type, task.idt_id, task.label, task.colour, getattr(task, 'lead', ''),
+                          [source.idt_id for source in task.sources]])
+        if plot_key:
+            items.append(Key._read_rows())
+        text = json.dumps(items)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def read_manifest():
+        """ Read the fingerprints of the existing diagrams ({kdp_id: fingerprint}). """
+        if not os.path.exists(DataFlow.manifest_path):
+            return {}
+        with open(DataFlow.manifest_path, 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def write_manifest(manifest):
+        with open(DataFlow.manifest_path, 'w') as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        return
 
     @staticmethod
     def _filter_tasks(tgt_kdp):
-        """ Select the subset of CAPs and CARs which flow data to a specific KDP.
-        Remove duplicate CARs and sort them by start time. """
-        from cap_utils import CapUtils
-        from car_utils import CarUtils
-        import numpy as np
-
-        cars, caps = [], []
-        for tgt_cap in tgt_kdp.sources:
-            caps.append(tgt_cap)
-            cars, caps = DataFlow._get_source_cars(tgt_cap, cars, caps)
-
-        # Remove duplicates
-        cars = DataFlow._remove_duplicates(cars)
-        caps = DataFlow._remove_duplicates(caps)
-
-        # Sort by start time
-        sor_cars = [cars[0]]
-        for car in cars[1:]:
-            i = 0
-            for scar in sor_cars:
-                if car.t_start < scar.t_start:
-                    sor_cars.insert(i, car)
-                    break
-                i += 1
-            if i == len(sor_cars):
-                sor_cars.append(car)
-        cars = sor_cars
+        """ Select the subset of CAPs and CARs which flow data to a specific KDP,
+        using the plan's closure index, with CARs sorted by start time. """
+        from plan_context import PlanContext
+        from closure_index import ClosureIndex
+
+        ctx = PlanContext.current()
+        if ctx.closure_index is None:       # Index the CAP source trees once per plan
+            ctx.closure_index = ClosureIndex(ctx.cars, ctx.caps)
+        cars, caps = ctx.closure_index.select(tgt_kdp)
 
         # Enforce CAR dependencies for filtered list and remove CAR row breaks
         cars[0].sources = []
         for i in range(1, len(cars)):
             cars[i].sources = [cars[i-1]]
         return cars, caps
-
-    @staticmethod
-    def _remove_duplicates(tasks):
-        # Remove duplicate tasks
-        uni_tasks = []
-        for task in tasks:
-            is_unique = True
-            for c in uni_tasks:
-                if task.idt_id == c.idt_id:
-                    is_unique = False
-                    break
-            if is_unique:
-                uni_tasks.append(task)
-        return uni_tasks
@@ -1,6 +1,9 @@
 from source.kdp import Kdp
 from car_utils import CarUtils
 from task import Task
+from cache import Cache
+from plan_context import PlanContext
+import numpy as np
 
 
 class KdpUtils:
@@ -10,53 +13,70 @@ class KdpUtils:
         """ Create kdps from parameters in file 'kdps.csv', with lists of input
         and output CARs linked from the passed list 'cars'.
         """
-        KdpUtils.kdps = self._read_kdps()
+        PlanContext.current().kdps = self._read_kdps()
         return
 
     @staticmethod
     def get_kdp(idt_id, **kwargs):
-        task_list = kwargs.get('kdp_list', KdpUtils.kdps)
-        return Task._get_task(idt_id, task_list)
+        """ Find a KDP in the task registry, or in kdp_list if specified. """
+        if 'kdp_list' in kwargs:
+            return Task._get_task(idt_id, kwargs['kdp_list'])
+        return PlanContext.current().registry.get(idt_id, 'KDP')
 
     def _read_kdps(self):
         from cap_utils import CapUtils
 
         path = '../inputs/kdps.csv'
-
-        with open(path, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
-        n_lines = len(line_list)
+        registry = PlanContext.current().registry
+        registry.clear('KDP')
+        kdp_table = Cache.read(path, KdpUtils._parse_kdps)
+        source_lists = Cache.unpack(kdp_table['sources'], kdp_table['source_offsets'])
         kdps = []
-        for row in range(2, n_lines, 2):
-            kdp_tokens = self._parse_line(line_list[row])
-            if len(kdp_tokens) > 3:
-                idt_id, label, ng_id, title, colour = (token for token in kdp_tokens[0:5])
-                source_tokens = self._parse_line(line_list[row + 1])
-                sources = []
-                for token in source_tokens[1:]:
-                    cap, err_msg = CapUtils.get_cap(token)
-                    if cap is not None:
-                        sources.append(cap)
-                kdp = Kdp(idt_id, label, colour, sources)
-                kdps.append(kdp)
+        for kdp_tokens, source_tokens in zip(kdp_table['kdps'], source_lists):
+            idt_id, label, ng_id, title, colour = (str(token) for token in kdp_tokens)
+            sources = []
+            for token in source_tokens:
+                cap, err_msg = CapUtils.get_cap(token)
+                if cap is not None:
+                    sources.append(cap)
+            kdp = Kdp(idt_id, label, colour, sources)
+            kdps.append(kdp)
+            registry.add(kdp)
         return kdps
 
     @staticmethod
-    def connect_kdps(kdps):
+    def _parse_kdps(path):
+        """ Read the KDP parameters (idt_id, label, ng_id, title, colour) and the
+        list of source CAP identifiers for each KDP in 'kdps.csv'.
+        """
+        from tools import Tools
+
+        kdp_rows, source_lists = [], []
+        lines = Tools.read_lines(path, n_header_lines=2)
+        for line in lines:                      # KDP parameters, followed by a line of sources
+            source_line = next(lines, '')
+            kdp_tokens = KdpUtils._parse_line(line)
+            if len(kdp_tokens) > 3:
+                kdp_rows.append(kdp_tokens[0:5])
+                source_tokens = KdpUtils._parse_line(source_line)
+                source_lists.append(source_tokens[1:])
+        sources, source_offsets = Cache.pack(source_lists)
+        kdp_table = {'kdps': np.array(kdp_rows, dtype=str).reshape(-1, 5),
+                     'sources': sources, 'source_offsets': source_offsets}
+        return kdp_table
+
+    @staticmethod
+    def connect_kdps(kdps, conduit):
         """ Connect CAPs to their sources by generating a plottable 'loom'
         object.
         """
-        from conduit import Conduit
-        from loom import Loom
-
         for kdp in kdps:
-            kdp.loom.construct()
+            kdp.loom.construct(conduit)
         return
 
     @staticmethod
     def schedule_kdps():
-        for kdp in KdpUtils.kdps:
+        for kdp in PlanContext.current().kdps:
             kdp_row = KdpUtils.schedule_kdp(kdp)
         return
 
@@ -72,38 +92,23 @@ class KdpUtils:
                 last_task = task
             else:
                 t_start_min
-        kdp.add_source(last_task)
+        if last_task not in kdp.sources:        # Don't add duplicate sources when rescheduled
+            kdp.add_source(last_task)
         kdp.t_start = t_start_min
-        kdp_row = last_task.row         # Used by method layout_kdps
+        kdp_row = last_task.row
         return kdp_row
 
     @staticmethod
-    def layout_kdps(kdps):
-        from conduit import Conduit
-
+    def layout_kdps(kdps, conduit):
+        """ Schedule each KDP and position it in the cell set by Layout.place. """
         for kdp in kdps:
-            # Find last input to this cap
-#            last_task = None
-#            t_start_min = -999.0         # earliest start time (L + day)
-#            for task in kdp.sources:
-#                t_end = task.get_t_end()
-#                if t_end > t_start_min:
-#                    t_start_min = t_end
-#                    last_task = task
-#                else:
-#                    t_start_min
-#            kdp.add_source(last_task)
-#            kdp.t_start = t_start_min
-#            kdp_row = last_task.row
-            kdp_row = KdpUtils.schedule_kdp(kdp)
-
-            start_col = Conduit.n_cols_list[0] + Conduit.n_cols_list[1]
-            kdp_col = Conduit.get_free_col(kdp_row, start_col)
-            kdp.row, kdp.col = kdp_row, kdp_col
-            kdp.set_position()
+            KdpUtils.schedule_kdp(kdp)
+            conduit.cell_occupation[kdp.row, kdp.col] = True
+            kdp.set_position(conduit)
         return
 
-    def _parse_line(self, line):
+    @staticmethod
+    def _parse_line(line):
         """ Parse a line of comma delimited text into a token list, with
         trailing empty tokens removed.
         """
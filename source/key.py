@@ -1,37 +1,46 @@
 class Key:
+    """ Key (legend) for the dataflow diagrams, read from file 'key.txt'.  The
+    text and the extents of each text item (in points, relative to its anchor)
+    are cached for each font size, so the legend box is sized without laying out
+    the text again each time a key is plotted.
+    """
+    path = '../inputs/key.txt'
+    tab = 120.0
+    margin = 2.0
+    dy = 8.0                # Line spacing
+    width = 320.0           # Width of the space kept for the key in a diagram
+    rows = None             # Text items on each line of the key
+    extents = {}            # {fontsize: array of [xmin, ymin, xmax, ymax] (points) for each item}
 
     def __init__(self):
         return
 
-    def plot(self, ax, xtl, ytl):
-        import matplotlib.pyplot as plt
-
-        tab = 120.0
-        margin = 2.0
-        path = '../inputs/key.txt'
-        with open(path, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
-        x = xtl + margin
-        dy = 8.0        # Line spacing
-        fig = plt.figure()
-        y = ytl - margin - dy
+    def plot(self, ax, xtl, ytl, **kwargs):
+        import matplotlib
+        import numpy as np
+
+        fontsize = kwargs.get('fontsize', matplotlib.rcParams['font.size'])
+        tab, margin, dy = Key.tab, Key.margin, Key.dy
+        rows = Key._read_rows()
+        extents = Key._get_extents(ax, fontsize)
+
         xs = [xtl + margin, xtl + margin + tab]
-        inf = 9999.0
-        x0, x1, y0, y1 = inf, -inf, inf, -inf
-        for line in line_list:
-            tokens = line.split("\\t")
+        y = ytl - margin - dy
+        anchors = []
+        for tokens in rows:
             for i in range(0, len(tokens)):
-                text = ax.text(xs[i], y, tokens[i])
-                renderer = fig.canvas.get_renderer()
-                transf = ax.transData.inverted()
-                bbox_pix = text.get_window_extent(renderer)
-                bbox = bbox_pix.transformed(transf)
-                x0 = x0 if x0 < bbox.xmin else bbox.xmin
-                x1 = x1 if x1 > bbox.xmax else bbox.xmax
-                y0 = y0 if y0 < bbox.ymin else bbox.ymin
-                y1 = y1 if y1 > bbox.ymax else bbox.ymax
+                ax.text(xs[i], y, tokens[i], fontsize=fontsize)
+                anchors.append([xs[i], y])
             y -= dy
+
+        # Bounding box of all text in data coordinates
+        pix_per_pt = ax.figure.dpi / 72.0
+        xy_pix = ax.transData.transform(np.array(anchors))
+        corners_pix = np.concatenate((xy_pix + pix_per_pt * extents[:, 0:2],
+                                      xy_pix + pix_per_pt * extents[:, 2:4]))
+        corners = ax.transData.inverted().transform(corners_pix)
+        x0, y0 = np.min(corners, axis=0)
+        x1, y1 = np.max(corners, axis=0)
         x0 -= margin
         y0 -= margin
         x1 += margin + 20.0
@@ -40,3 +49,42 @@ class Key:
         y = [y0, y0, y1, y1, y0]
         ax.plot(x, y, color='black', ls='-')
         return
+
+    @staticmethod
+    def get_height():
+        """ Height of the key box in data units. """
+        return (len(Key._read_rows()) + 1) * Key.dy + 2.0 * Key.margin
+
+    @staticmethod
+    def _read_rows():
+        if Key.rows is None:
+            with open(Key.path, 'r') as file:
+                text_block = file.read()
+            Key.rows = [line.split("\\t") for line in text_block.split('\n')]
+        return Key.rows
+
+    @staticmethod
+    def _get_extents(ax, fontsize):
+        """ Measure the extents of all text items in the key in a single pass,
+        using the renderer of the figure which holds the passed axes.
+        """
+        import numpy as np
+        from matplotlib.text import Text
+        from matplotlib.transforms import IdentityTransform
+
+        extents = Key.extents.get(fontsize, None)
+        if extents is not None:
+            return extents
+        fig = ax.figure
+        renderer = fig.canvas.get_renderer()
+        pt_per_pix = 72.0 / fig.dpi
+        extents = []
+        for tokens in Key._read_rows():
+            for token in tokens:
+                text = Text(0.0, 0.0, token, fontsize=fontsize, transform=IdentityTransform())
+                text.set_figure(fig)
+                bbox = text.get_window_extent(renderer)
+                extents.append([bbox.xmin, bbox.ymin, bbox.xmax, bbox.ymax])
+        extents = pt_per_pix * np.array(extents).reshape(-1, 4)
+        Key.extents[fontsize] = extents
+        return extents
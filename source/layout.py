@@ -0,0 +1,103 @@
+#!/usr/bin/python
+import math
+
+
+class Layout:
+    """ Layered placement of the tasks of a dataflow diagram in the cells of a
+    Conduit grid.  The CARs fill a block of rows (left to right, top to bottom)
+    whose width is set from the number of CARs.  Each CAP is then placed in a
+    layer (column) set by the longest chain of CAPs which feeds it, with the
+    KDPs in a final layer.  Within a layer, tasks are sorted by the mean row of
+    their sources (barycentre heuristic), which keeps most wires short and
+    uncrossed, and take the free row nearest to that mean.  A layer which has
+    more tasks than rows is spread over several columns.  All steps are linear
+    in the number of tasks and links, apart from the sort within each layer.
+    """
+    car_aspect = 2.0            # Target number of CAR rows per CAR column
+    max_car_cols = 12
+
+    def __init__(self):
+        return
+
+    @staticmethod
+    def place(cars, caps, kdps):
+        """ Set the row and column of every task in a diagram.
+        :return: n_rows, (n_car_cols, n_cap_cols, n_kdp_cols) for the Conduit
+        """
+        from car_utils import CarUtils
+
+        n_car_cols = Layout.get_car_cols(len(cars))
+        n_rows = CarUtils.layout_cars(cars, n_car_cols)
+
+        placed = {id(car) for car in cars}
+        cap_col = n_car_cols
+        for layer in Layout.get_layers(caps):
+            cap_col += Layout._place_layer(layer, n_rows, cap_col, placed)
+        n_cap_cols = cap_col - n_car_cols
+        n_kdp_cols = Layout._place_layer(kdps, n_rows, cap_col, placed)
+        return n_rows, (n_car_cols, n_cap_cols, n_kdp_cols)
+
+    @staticmethod
+    def get_car_cols(n_cars):
+        n_cols = int(round(math.sqrt(n_cars / Layout.car_aspect)))
+        return min(max(n_cols, 1), Layout.max_car_cols)
+
+    @staticmethod
+    def get_layers(caps):
+        """ Sort the CAPs into layers, where layer n holds the CAPs which have
+        a source CAP in layer n-1 (Kahn's topological sort).  CAPs keep their
+        list order within a layer.  CAPs whose sources form a loop (and any
+        CAPs fed by them) are put in a final layer, so every CAP is placed.
+        """
+        cap_ids = {id(cap) for cap in caps}
+        n_pending = {}              # {id(cap): number of source CAPs not yet in a layer}
+        users = {}                  # {id(cap): CAPs which take data from this CAP}
+        for cap in caps:
+            cap_sources = {id(source): source for source in cap.sources if id(source) in cap_ids}
+            n_pending[id(cap)] = len(cap_sources)
+            for source in cap_sources.values():
+                users.setdefault(id(source), []).append(cap)
+
+        order = {id(cap): i for i, cap in enumerate(caps)}
+        layers = []
+        layer = [cap for cap in caps if n_pending[id(cap)] == 0]
+        while len(layer) > 0:
+            layers.append(layer)
+            next_layer = []
+            for cap in layer:
+                for user in users.get(id(cap), []):
+                    n_pending[id(user)] -= 1
+                    if n_pending[id(user)] == 0:
+                        next_layer.append(user)
+            layer = sorted(next_layer, key=lambda cap: order[id(cap)])
+        loop_layer = [cap for cap in caps if n_pending[id(cap)] > 0]
+        if len(loop_layer) > 0:
+            print('Error - CAP sources form a loop, {:d} CAPs placed in a final layer'.format(len(loop_layer)))
+            layers.append(loop_layer)
+        return layers
+
+    @staticmethod
+    def _place_layer(tasks, n_rows, start_col, placed):
+        """ Place a layer of tasks in one or more columns of n_rows cells, in
+        order of the mean row of their sources.  Sources which are not in the
+        set of placed tasks (ids) are ignored.
+        :return: number of columns used
+        """
+        if len(tasks) == 0:
+            return 0
+        rows = []
+        for task in tasks:
+            source_rows = [source.row for source in task.sources if id(source) in placed]
+            rows.append(sum(source_rows) / len(source_rows) if len(source_rows) > 0 else 0.0)
+        order = sorted(range(len(tasks)), key=lambda i: rows[i])
+        n_cols = (len(tasks) + n_rows - 1) // n_rows
+        for c in range(0, n_cols):
+            col_order = order[c::n_cols]            # Deal tasks between columns so each spans all rows
+            n_tasks = len(col_order)
+            row = -1
+            for j, i in enumerate(col_order):
+                ideal_row = int(round(rows[i]))
+                row = min(max(ideal_row, row + 1), n_rows - (n_tasks - j))
+                tasks[i].row, tasks[i].col = row, start_col + c
+        placed.update([id(task) for task in tasks])
+        return n_cols
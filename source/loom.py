@@ -1,9 +1,8 @@
 #!/usr/bin/python
-from conduit import Conduit
+import numpy as np
+from plan_context import PlanContext
 
 class Loom:
-    uid_counter = 0
-    free_uid = 'UID-tbd'
     n_tracks = 6        # Number of connections per row
     n_shafts = 8        # Number of connections per column
     track_pitch = 1.0
@@ -11,8 +10,8 @@ class Loom:
 
 
     def __init__(self, task, **kwargs):
-        Loom.uid_counter += 1                               # Increment global loom counter
-        self.uid = "LOO{:04d}".format(Loom.uid_counter)     # ..and assign to this instance
+        self.index = PlanContext.current().next_index('LOO')    # Unique within this plan
+        self.uid = "LOO{:04d}".format(self.index)
         self.task = task                                    # Task this loom connects to
         self.colour1 = kwargs.get('colour1', 'black')
         self.colour2 = kwargs.get('colour2', 'red')
@@ -21,8 +20,9 @@ class Loom:
         self.spars, self.stubs, self.arrows, self.plugs = [], [], [], []
         return
 
-    def construct(self):
-        """ Construct the loom, connecting this task to its sources
+    def construct(self, conduit):
+        """ Construct the loom, connecting this task to its sources, using the
+        wire tracks in the passed Conduit grid.
         """
         from car import Car
         from cap import Cap
@@ -30,12 +30,12 @@ class Loom:
         this_task = self.task
         face, channel = 'l', 'v1'
         # All looms have a vertical 'mast' to the left of the target CAP or KDP
-        x_socket, y_socket = this_task.get_socket(self.uid, face=face)  # CAP or KDP
-        x_mast = Conduit.get_wire(this_task, self, channel=channel)
+        x_socket, y_socket = this_task.get_socket(self, face=face)  # CAP or KDP
+        x_mast = conduit.get_wire(this_task, self, channel=channel)
         mast = [[x_mast, x_mast], [y_socket, y_socket]]
         # Initialise array of spars running from input tasks to the mast
         spars = []
-        for row in range(0, Conduit.n_rows):
+        for row in range(0, conduit.n_rows):
             spars.append([[x_mast, x_mast], [y_socket, y_socket]])
         # Initialise plot arrays
         arrows = []
@@ -46,17 +46,17 @@ class Loom:
         for source in this_task.sources:
             row, col = source.row, source.col
             type = source.type
-            y_wire = Conduit.get_wire(source, self, channel='hl')
+            y_wire = conduit.get_wire(source, self, channel='hl')
             spar = spars[row]
             spar[1][0], spar[1][1] = y_wire, y_wire
             if type == 'CAR':
-                x_socket, y_socket = source.get_socket(self.uid, face='b')
+                x_socket, y_socket = source.get_socket(self, face='b')
                 stubs.append([[x_socket, x_socket], [y_socket, y_wire]])
                 plugs.append([x_socket, y_socket, 'b'])  # Plug at input
                 x_spar = x_socket
             else:
-                x_socket, y_socket = source.get_socket(self.uid, face='r')
-                x_wire = Conduit.get_wire(source, self, channel='v2')
+                x_socket, y_socket = source.get_socket(self, face='r')
+                x_wire = conduit.get_wire(source, self, channel='v2')
                 stubs.append([[x_socket, x_wire, x_wire], [y_socket, y_socket, y_wire]])
                 plugs.append([x_socket, y_socket, 'r'])  # Plug at input
                 x_spar = x_wire
@@ -78,29 +78,45 @@ class Loom:
         return
 
     def plot(self, ax):
+        Loom.plot_looms(ax, [self])
+        return
+
+    @staticmethod
+    def plot_looms(ax, looms):
+        """ Plot the wiring of a list of looms as a few collection artists (a
+        solid and a dashed LineCollection for the stubs, spars and masts and a
+        PolyCollection for the plugs and arrows), rather than one artist per
+        line.  Zero length lines (eg the spars of unused rows) are not drawn.
+        """
+        from matplotlib.collections import LineCollection, PolyCollection
         from task import Task
 
-        for stub in self.stubs:
-            x, y = stub[0], stub[1]
-            Loom._plot_line(ax, x, y, self.colour1, self.colour2)
-        for spar in self.spars:
-            x, y = spar[0], spar[1]
-            Loom._plot_line(ax, x, y, self.colour1, self.colour2)
-        x, y = self.mast[0], self.mast[1]
-        Loom._plot_line(ax, x, y, self.colour1, self.colour2)
+        lines, colours1, colours2, widths = [], [], [], []
+        polygons, poly_colours = [], []
         wid = Task.socket_pitch / 2.0
-        for plug in self.plugs:
-            Loom._plot_socket(ax, plug[0], plug[1], plug[2],
-                              shape='plug', wid=wid, colour=self.colour2)
-        for arrow in self.arrows:
-            Loom._plot_socket(ax, arrow[0], arrow[1], arrow[2],
-                              shape='arrow', wid=wid, colour=self.colour2)
-        return
+        for loom in looms:
+            for x, y in loom.stubs + loom.spars + [loom.mast]:
+                line = np.column_stack((x, y))
+                if np.all(line == line[0]):         # Zero length
+                    continue
+                lines.append(line)
+                colours1.append(loom.colour1)
+                colours2.append(loom.colour2)
+                widths.append(loom.lw)
+            sockets = [(plug, 'plug') for plug in loom.plugs] + [(arrow, 'arrow') for arrow in loom.arrows]
+            for socket, shape in sockets:
+                xs, ys = Loom._get_socket_outline(socket[0], socket[1], socket[2], shape=shape, wid=wid)
+                polygons.append(np.column_stack((xs, ys)))
+                poly_colours.append(loom.colour2)
 
-    @staticmethod
-    def _plot_line(ax, x, y, colour1, colour2):
-        ax.plot(x, y, ls='-', color=colour1)
-        ax.plot(x, y, ls='--', color=colour2)
+        solid = LineCollection(lines, colors=colours1, linewidths=widths, linestyles='-',
+                               capstyle='projecting', joinstyle='round')
+        dashed = LineCollection(lines, colors=colours2, linewidths=widths, linestyles='--',
+                                capstyle='butt', joinstyle='round')
+        sockets = PolyCollection(polygons, facecolors=poly_colours, edgecolors=poly_colours, linewidths=1.0)
+        ax.add_collection(solid, autolim=False)
+        ax.add_collection(dashed, autolim=False)
+        ax.add_collection(sockets, autolim=False)
         return
 
     @staticmethod
@@ -113,9 +129,14 @@ class Loom:
         points towards the edge specified in lrud, and the plug is drawn
         inside the box, and and lying with its long edge alibg lrud.
         """
-        import numpy as np
-
         colour = kwargs.get('colour', 'black')
+        xs, ys = Loom._get_socket_outline(x, y, lrbt, **kwargs)
+        ax.fill(xs, ys, color=colour)
+        return
+
+    @staticmethod
+    def _get_socket_outline(x, y, lrbt, **kwargs):
+        """ Vertices of a socket symbol (see _plot_socket). """
         shape = kwargs.get('shape', 'arrow')
         wid = kwargs.get('wid', 3.0)
         len = 2.0 * wid
@@ -132,5 +153,4 @@ class Loom:
             xs, ys = np.subtract(xs, v), np.subtract(ys, u)
         if lrbt == 'b':
             xs, ys = np.add(xs, v), np.subtract(ys, u)
-        ax.fill(xs, ys, color=colour)
-        return
+        return xs, ys
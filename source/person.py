@@ -4,20 +4,27 @@ from shift_plan import ShiftPlan
 
 
 class Person:
-
+    """ A member of staff.  The person's timetable (one role code per day) is
+    a view onto their row (index) of the shift plan's role matrix, with each
+    role held as the character code of its letter in the printed plan.  The
+    timetable is written using set_role, which keeps a count of the days in
+    each role and the length of the console block around the day written.
+    """
     arrival_buffer = 0      # Arrive in Baltimore n days before task
     departure_buffer = 0    # Leave at least n days after
-    role_console = 'm'      # Supporting one of the three shifts on this day
-    role_sme_console = 'M'
-    role_free = '.'         # Not schedulable
-    blackout = 'X'          # Person is not available in Baltimore
-    greyout = 'x'           # Person not required on shift (set by Alistair)
-    role_analyst = 'a'      # In Baltimore but not on shift (Analysis or support role)
-    role_sme_analyst = 'A'  # Analyst for a CAR running on this day
-    role_kdp = 'K'          # Supporting a KDP on this day
-    role_remote_analyst = 'R'
+    role_console = ord('m')     # Supporting one of the three shifts on this day
+    role_sme_console = ord('M')
+    role_free = ord('.')        # Not schedulable
+    blackout = ord('X')         # Person is not available in Baltimore
+    greyout = ord('x')          # Person not required on shift (set by Alistair)
+    role_analyst = ord('a')     # In Baltimore but not on shift (Analysis or support role)
+    role_sme_analyst = ord('A')     # Analyst for a CAR running on this day
+    role_kdp = ord('K')         # Supporting a KDP on this day
+    role_remote_analyst = ord('R')
 
-    def __init__(self, idents, availabilty):
+    def __init__(self, idents, availabilty, plan, index):
+        self.plan = plan                            # ShiftPlan which this person is scheduled in
+        self.index = index                          # Row in plan role matrix, entry in rota
         self.initial, self.forename, self.surname, self.email, self.organisation, self.bar_colour = idents
         self.is_reserve, max_nweeks, max_nweeks_block, self.blackout_days, self.greyout_days, schedule_days, analysis_days = availabilty
         self.fg_colour = 'blue'
@@ -25,20 +32,23 @@ class Person:
             self.fg_colour = 'black'
         self.max_allocation = 7 * max_nweeks
         self.max_contiguous_allocation = 7 * max_nweeks_block
-        self.contiguously_allocated = 0
-        self.timetable = np.full(ShiftPlan.n_days, Person.role_free)
+        self.contiguously_allocated = 0             # Length of console block at the last day set
+        self.timetable = self.plan.roles[index]      # View of role matrix row
+        self.timetable[:] = Person.role_free
+        self.role_counts = [0] * 256                # Number of days in each role (indexed by role code)
+        self.role_counts[Person.role_free] = self.plan.n_days
         for day in schedule_days:                   # Set on console by Alistair
-            if 0 <= day < ShiftPlan.n_days - 1:
-                self.timetable[day] = Person.role_console
+            if 0 <= day < self.plan.n_days - 1:
+                self.set_role(day, Person.role_console)
         for day in analysis_days:
-            if 0 <= day < ShiftPlan.n_days - 1:
-                self.timetable[day] = Person.role_analyst
+            if 0 <= day < self.plan.n_days - 1:
+                self.set_role(day, Person.role_analyst)
         for day in self.greyout_days:               # Set unavailable by Alistair (overwrites his on console settings)
-            if 0 <= day < ShiftPlan.n_days - 1:
-                self.timetable[day] = Person.greyout
+            if 0 <= day < self.plan.n_days - 1:
+                self.set_role(day, Person.greyout)
         for day in self.blackout_days:              # Personally specified as unavailable (top priority)
-            if 0 <= day < ShiftPlan.n_days - 1:
-                self.timetable[day] = Person.blackout
+            if 0 <= day < self.plan.n_days - 1:
+                self.set_role(day, Person.blackout)
         self.sme_tasks = []
         return
 
@@ -49,6 +59,34 @@ class Person:
         text = "{:s}{:4d}/{:d}".format(self.surname, self._get_allocated(), self.max_allocation)
         return text
 
+    def set_role(self, day, role):
+        """ Set this person's role on a day, updating the role counts and the
+        length of the console block which includes the day (zero if the new
+        role is not on console).  Scheduling is not changed by the block length.
+        """
+        tt = self.timetable
+        self.role_counts[tt[day]] -= 1
+        self.role_counts[role] += 1
+        tt[day] = role
+        is_console = role in (Person.role_console, Person.role_sme_console)
+        self.contiguously_allocated = self.get_block_length(day) if is_console else 0
+        return
+
+    def get_block_length(self, day):
+        """ Find the length of the block of console days which would include
+        this day if the person were on console on it, from the console days
+        either side (so it can be checked before the day is set).  The cost is
+        bounded by the block length.
+        """
+        tt = self.timetable
+        console_roles = Person.role_console, Person.role_sme_console
+        first, last = day, day
+        while first > 0 and tt[first - 1] in console_roles:
+            first -= 1
+        while last < len(tt) - 1 and tt[last + 1] in console_roles:
+            last += 1
+        return last - first + 1
+
     def is_available(self, day):
         """ Check if this person is available for MOC a shift on a specific day """
         status = self.timetable[day]
@@ -58,39 +96,27 @@ class Person:
         return is_available
 
     def _remove_from_rota(self, rota, col):
-        rota_column = rota[:, col]
-        for row, slot in enumerate(rota_column):
-            if slot != None and slot.initial == self.initial:
-                rota[row, col] = None
-                return rota
+        rota.remove(self.index, col)
         return rota
 
     def _get_allocated(self):
         """ Find the number of days currently allocated to this person to be available
         on console.
         """
-        tt = self.timetable
-        n_console = len(np.where(tt == self.role_console)[0])
-        n_sme_console = len(np.where(tt == self.role_sme_console)[0])
-        n_allocated = n_sme_console + n_console
+        counts = self.role_counts
+        n_allocated = counts[Person.role_console] + counts[Person.role_sme_console]
         return n_allocated
 
     def _find_free_slot(self, rota, col, n_slots):
-        """ Find the the first free row (slot) in a column (day) of the rota.  Returns None if n_slots are
-        already filled.
+        """ Find this person's slot in a column (day) of the rota, or the next free slot.  Returns None if
+        n_slots are already filled.
         """
-        free_slots = []
-        count_filled = 0
-        for slot, person in enumerate(rota[:, col]):
-            if person == self:
-                return slot
-            if person == None:
-                free_slots.append(slot)
-            else:
-                count_filled += 1
-        if count_filled >= n_slots:
+        slot = rota.get_slot(self.index, col)
+        if slot is not None:
+            return slot
+        if rota.n_filled[col] >= n_slots:
             return None
-        return free_slots[0]
+        return rota.get_free_slot(col)
 
     def schedule_tasks(self, rota, task_type):
         """ Allocate this person to support all tasks in their sme list of a specific type
@@ -105,9 +131,9 @@ class Person:
         """ Schedule this person in the rota.  The start day of any allocation block is set to be a Tuesday
         or Friday to help with badging and travel.
         """
-        daily_slots = ShiftPlan.daily_slot_quota
+        daily_slots = self.plan.daily_slot_quota
         task_day = int(task.t_start + ShiftPlan.launchhour/24.0)
-        task_col = task_day - ShiftPlan.start_md
+        task_col = task_day - self.plan.start_md
         start_col = task_col - self.arrival_buffer            # start_md - ShiftPlan.start_day
         end_col = int(task_col + task.t_dur)                         #self.departure_buffer
         if task.type == 'KDP':
@@ -123,7 +149,7 @@ class Person:
 
             is_unavailable = is_blackout or is_greyout
             if is_unavailable:
-                md = col + ShiftPlan.start_md
+                md = col + self.plan.start_md
                 if requested_role == 'R':
                     fmt = "{:s} analysing {:s} ({:s}) remotely on L+{:d}"
                 else:
@@ -167,28 +193,28 @@ class Person:
                                 if row is not None:
                                     if col == task_col:
                                         role = Person.role_sme_console
-                                    rota[row, col] = self       # Allocate CARs on rota.
-                self.timetable[col] = role                      # Allocate all tasks in personal timetable
+                                    rota.insert(self.index, col)    # Allocate CARs on rota.
+                self.set_role(col, role)                        # Allocate all tasks in personal timetable
         return rota
 
     def schedule_forced(self, rota):
         """ Allocate this person into the rota on the days when they are prescheduled to be
         on shift in their timetable. """
-        daily_slots = ShiftPlan.daily_slot_quota
-        n_rows, n_days = rota.shape
+        daily_slots = self.plan.daily_slot_quota
+        n_days = rota.n_days
         start_col, end_col, car_col = 0, n_days, -1         # Default - schedule all of commissioning
         for col in range(start_col, end_col):
             n_slots = daily_slots[col]
             if self.timetable[col] == Person.role_console:
                 row = self._find_free_slot(rota, col, n_slots)  # Find free slot in rota
                 if row is not None:
-                    rota[row, col] = self
+                    rota.insert(self.index, col)
         return rota
 
     def schedule_remaining(self, rota):
         """ Schedule remaining allocation for this person to be on console rota """
-        daily_slots = ShiftPlan.daily_slot_quota
-        n_rows, n_days = rota.shape
+        daily_slots = self.plan.daily_slot_quota
+        n_days = rota.n_days
         start_col, end_col, car_col = 0, n_days, -1                     # Default - schedule all of commissioning
 
         for col in range(start_col, end_col):
@@ -201,8 +227,8 @@ class Person:
                 if ok_total:
                     row = self._find_free_slot(rota, col, n_slots)      # Find free slot in rota
                     if row is not None:
-                        rota[row, col] = self
-                        self.timetable[col] = Person.role_console
+                        rota.insert(self.index, col)
+                        self.set_role(col, Person.role_console)
         return rota
 
     @staticmethod
@@ -228,17 +254,17 @@ class Person:
         return str
 
     @staticmethod
-    def get_attendance_header_string(**kwargs):
+    def get_attendance_header_string(plan, **kwargs):
         to_csv = kwargs.get('to_csv', False)
 
         str = "{:>6s}".format("L + |")
         days_week = 7
-        day = ShiftPlan.start_md       # + days_week       # Label is at start of week
+        day = plan.start_md       # + days_week       # Label is at start of week
         width = days_week
         fmt = '{:<' + "{:d}".format(width) + '}'
         if to_csv:
             fmt = ',' + fmt
-        while day < ShiftPlan.n_days:
+        while day < plan.n_days:
             tag = fmt.format(day)
             str += tag
             day += days_week
@@ -250,13 +276,9 @@ class Person:
         str = "{:>6s}".format("|")
         if to_csv:
             str = str + ','
-        day = ShiftPlan.start_md
-        dow = 0
-        for code in self.timetable:
-            str += code
-            day += 1
-            dow += 1
-            if dow == 7 and to_csv:
-                str += ','
-                dow = 0
+        codes = self.timetable.tobytes().decode('ascii')
+        if to_csv:                      # Comma after each week
+            n_weeks = len(codes) // 7
+            codes = ''.join([codes[7*i:7*i+7] + ',' for i in range(0, n_weeks)]) + codes[7*n_weeks:]
+        str += codes
         return str
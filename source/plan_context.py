@@ -0,0 +1,72 @@
+#!/usr/bin/python
+import threading
+
+
+class PlanContext:
+    """ PlanContext holds the state of a single plan (scenario); the CARs, CAPs
+    and KDPs with their task registry, the shift plan and the task and loom
+    uid counters.
+
+    Code which reads or builds a plan uses the context returned by
+    PlanContext.current().  This is the default (process wide) context, unless
+    a context has been activated in the calling thread using,
+        with PlanContext() as ctx:
+            ...
+    so that several plans can be built side by side in threads or worker
+    processes without overwriting each other.  The context is found this way
+    (rather than passed to every Task, Loom and utility class) so that the
+    existing constructors keep their signatures.
+    """
+    _local = threading.local()
+    _default = None
+    _default_lock = threading.Lock()    # Guards creation of the default context
+
+    def __init__(self):
+        from task_registry import TaskRegistry
+
+        self.cars, self.caps, self.kdps = [], [], []
+        self.registry = TaskRegistry()
+        self.closure_index = None           # Upstream CARs and CAPs of each CAP (see DataFlow)
+        self.plan = None                    # ShiftPlan
+        self.uid_counters = {'TSK': 0, 'LOO': 1}     # Next task and loom uid numbers
+        return
+
+    def __enter__(self):
+        stack = PlanContext._get_stack()
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stack = PlanContext._get_stack()
+        stack.pop()
+        return False
+
+    @staticmethod
+    def current():
+        """ Return the active context for this thread. """
+        stack = PlanContext._get_stack()
+        if len(stack) > 0:
+            return stack[-1]
+        if PlanContext._default is None:
+            with PlanContext._default_lock:     # Only one thread creates the default
+                if PlanContext._default is None:
+                    PlanContext._default = PlanContext()
+        return PlanContext._default
+
+    def next_index(self, prefix):
+        """ Get the next integer id for a task ('TSK') or loom ('LOO'). """
+        n = self.uid_counters[prefix]
+        self.uid_counters[prefix] = n + 1
+        return n
+
+    def next_uid(self, prefix):
+        """ Get the next uid string for a task ('TSK') or loom ('LOO'). """
+        return "{:s}{:04d}".format(prefix, self.next_index(prefix))
+
+    @staticmethod
+    def _get_stack():
+        stack = getattr(PlanContext._local, 'stack', None)
+        if stack is None:
+            stack = []
+            PlanContext._local.stack = stack
+        return stack
@@ -4,8 +4,57 @@
 @author: achg
 """
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
+import matplotlib
+
+
+class FigurePool:
+    """ Pool of matplotlib figures, each drawn on its own Agg canvas using
+    the object oriented Figure API (no pyplot state).  A figure which is
+    released is kept, with its axes, and handed out again (resized and with
+    its axes cleared) for the next plot which has the same grid of axes.
+    """
+    free = {}               # {(nrows, ncols, sharex, sharey): [released figures]}
+    max_free = 2            # Figures kept for each grid of axes
+
+    def __init__(self):
+        return
+
+    @staticmethod
+    def get(figsize, nrows, ncols, **kwargs):
+        """ Get a figure and its (nrows, ncols) array of axes. """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        sharex = kwargs.get('sharex', False)
+        sharey = kwargs.get('sharey', False)
+        key = nrows, ncols, sharex, sharey
+        figures = FigurePool.free.get(key, [])
+        if len(figures) > 0:
+            fig = figures.pop()
+            fig.set_size_inches(figsize)
+            params = ['left', 'bottom', 'right', 'top', 'wspace', 'hspace']
+            fig.subplots_adjust(**{p: matplotlib.rcParams['figure.subplot.' + p] for p in params})
+            ax_list = fig.pool_axes
+            for ax in ax_list.flat:
+                ax.clear()
+                ax.set_aspect('auto')           # Not reset by clear
+            return fig, ax_list
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        ax_list = fig.subplots(nrows, ncols, sharex=sharex, sharey=sharey, squeeze=False)
+        fig.pool_key, fig.pool_axes = key, ax_list
+        return fig, ax_list
+
+    @staticmethod
+    def release(fig):
+        """ Return a figure to the pool, once it has been saved. """
+        key = getattr(fig, 'pool_key', None)
+        if key is None:
+            return
+        figures = FigurePool.free.setdefault(key, [])
+        if len(figures) < FigurePool.max_free:
+            figures.append(fig)
+        return
 
 
 class Plot:
@@ -26,16 +75,14 @@ class Plot:
         aspect = kwargs.get('aspect', 'auto')      # 'equal' for aspect = 1.0
         fontsize = kwargs.get('fontsize', 9)
         plotpad = kwargs.get('plotpad', 8.0)
+        figsize = kwargs.get('figsize', [50, 50])  # inches
 
-        gs = gridspec.GridSpec(nrows, ncols)
-        gs.update(wspace=0.03, hspace=0.05)
-        plt.rcParams.update({'font.size': fontsize})
+        matplotlib.rcParams.update({'font.size': fontsize})
 
         sharex = xlim is not None
         sharey = ylim is not None
-        fig, ax_list = plt.subplots(nrows, ncols, figsize=[50, 50],
-                                    sharex=sharex, sharey=sharey,
-                                    squeeze=False)
+        fig, ax_list = FigurePool.get(figsize, nrows, ncols,
+                                      sharex=sharex, sharey=sharey)
         fig.patch.set_facecolor('white')
         fig.suptitle(title)
         fig.tight_layout(pad=plotpad)
@@ -55,15 +102,17 @@ class Plot:
             rps = np.atleast_2d(remplots)
             for i in range(0, len(rps)):
                 ax_list[rps[i, 0], rps[i, 1]].remove()
+            fig.pool_key = None             # Axes removed, so don't reuse the figure
         return fig, ax_list
 
     @staticmethod
-    def clear():
-        plt.clf()
-        plt.close('all')
+    def clear(fig):
+        """ Release a saved figure for reuse. """
+        FigurePool.release(fig)
         return
 
     @staticmethod
     def show():
-        """ Wrapper for matplotlib show function. """
+        """ Wrapper for matplotlib show function (pyplot figures only). """
+        import matplotlib.pyplot as plt
         plt.show()
@@ -0,0 +1,111 @@
+#!/usr/bin/python
+import contextlib
+import json
+import sys
+import time
+
+
+class Profiler:
+    """ Instrumentation of the stages of a timeliner run.  Each stage, wrapped as,
+        with Profiler.stage('patch_cars') as stage:
+            ...
+            stage['n_items'] = len(cars)
+    records its wall clock and CPU time, the peak resident set size of the
+    process and an item count.  Plotting code calls Profiler.record_figure(fig)
+    before saving a figure, to log the number of matplotlib artists it holds.
+    Stages may be nested, with each record holding its depth (0 = top level).
+    The records are written as a JSON report by Profiler.write_report.
+    """
+    enabled = False                 # True = Record stages (set by timeliner option '--profile')
+    report_path = '../outputs/profile.json'
+    stages = []
+    _current = None                 # Record of the stage currently running
+
+    def __init__(self):
+        return
+
+    @staticmethod
+    @contextlib.contextmanager
+    def stage(name, **kwargs):
+        if not Profiler.enabled:
+            yield {}
+            return
+        parent = Profiler._current
+        depth = 0 if parent is None else parent['depth'] + 1
+        record = {'stage': name, 'depth': depth, 'n_items': kwargs.get('n_items', None), 'figures': []}
+        Profiler._current = record
+        t_wall, t_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - t_wall
+            record['cpu_s'] = time.process_time() - t_cpu
+            record['peak_rss_mb'] = Profiler._get_peak_rss()
+            Profiler._current = parent
+            Profiler.stages.append(record)
+        return
+
+    @staticmethod
+    def record_figure(fig, **kwargs):
+        """ Log the number of artists (patches, lines, text etc.) in a figure
+        against the current stage.
+        """
+        if not Profiler.enabled or Profiler._current is None:
+            return
+        name = kwargs.get('name', fig.get_suptitle() if hasattr(fig, 'get_suptitle') else '')
+        n_artists = len(fig.findobj())
+        Profiler._current['figures'].append({'name': name, 'n_artists': n_artists})
+        return
+
+    @staticmethod
+    def get_figures():
+        """ Get the figures logged against the current stage (eg to return them
+        from a worker process to the parent, see add_figures). """
+        if not Profiler.enabled or Profiler._current is None:
+            return []
+        return Profiler._current['figures']
+
+    @staticmethod
+    def add_figures(figures):
+        """ Add figures logged in another process to the current stage. """
+        if not Profiler.enabled or Profiler._current is None:
+            return
+        Profiler._current['figures'] += figures
+        return
+
+    @staticmethod
+    def write_report(**kwargs):
+        """ Write the stage records to a JSON file and print a summary. """
+        path = kwargs.get('path', Profiler.report_path)
+        stages = Profiler.stages
+        top_stages = [record for record in stages if record['depth'] == 0]    # Nested stages are in these
+        report = {'python': sys.version.split()[0],
+                  'total_wall_s': sum(record['wall_s'] for record in top_stages),
+                  'total_cpu_s': sum(record['cpu_s'] for record in top_stages),
+                  'stages': stages}
+        with open(path, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+        print('Profile written to {:s}'.format(path))
+        fmt = "  stage {:<36s}{:>10.3f} s wall{:>10.3f} s cpu{:>10.1f} MB{:>8s} items{:>8s} artists"
+        for record in stages:
+            n_items = record['n_items']
+            n_artists = sum(figure['n_artists'] for figure in record['figures'])
+            items_text = '-' if n_items is None else "{:d}".format(n_items)
+            artists_text = '-' if len(record['figures']) == 0 else "{:d}".format(n_artists)
+            name = '  ' * record['depth'] + record['stage']
+            print(fmt.format(name, record['wall_s'], record['cpu_s'],
+                             record['peak_rss_mb'], items_text, artists_text))
+        return
+
+    @staticmethod
+    def _get_peak_rss():
+        """ Peak resident set size of this process in MB (zero where the
+        'resource' module is not available, eg on Windows).
+        """
+        try:
+            import resource
+        except ImportError:
+            return 0.0
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        scale = 1024. * 1024. if sys.platform == 'darwin' else 1024.   # bytes on macOS, kB on Linux
+        return max_rss / scale
@@ -0,0 +1,81 @@
+#!/usr/bin/python
+import numpy as np
+from shift_plan import ShiftPlan
+
+
+class Rota:
+    """ The MOC rota, a matrix (slots) with one row per shift slot and one
+    column per day which holds the staff index of the person in each slot (or
+    ShiftPlan.free).  The occupancy of the slots is indexed, with the number of
+    filled slots and a stack of free slots for each day, and the slot of each
+    person on each day, so that people are added, removed and found in O(1).
+    The rota grows (doubling its slots) if a day needs more slots than it has.
+    """
+    def __init__(self, n_slots, n_days, n_staff):
+        self.n_slots, self.n_days = n_slots, n_days
+        self.slots = np.full((n_slots, n_days), ShiftPlan.free, dtype=np.int16)
+        self.n_filled = np.zeros(n_days, dtype=np.int32)                # Filled slots on each day
+        self.free_slots = [list(range(n_slots-1, -1, -1)) for day in range(0, n_days)]   # Lowest slot on top
+        self.staff_slots = np.full((n_staff, n_days), -1, dtype=np.int16)    # Slot of each person (-1 = none)
+        return
+
+    def get_slot(self, staff_idx, day):
+        """ Get the slot of a person on a day (None if not in the rota). """
+        slot = self.staff_slots[staff_idx, day]
+        return None if slot < 0 else int(slot)
+
+    def get_free_slot(self, day):
+        """ Get the slot which the next person added on a day will take. """
+        if len(self.free_slots[day]) == 0:
+            self._add_slots()
+        return self.free_slots[day][-1]
+
+    def insert(self, staff_idx, day):
+        slot = self.get_slot(staff_idx, day)
+        if slot is not None:
+            return slot
+        self.get_free_slot(day)
+        slot = self.free_slots[day].pop()
+        self.slots[slot, day] = staff_idx
+        self.staff_slots[staff_idx, day] = slot
+        self.n_filled[day] += 1
+        return slot
+
+    def remove(self, staff_idx, day):
+        slot = self.get_slot(staff_idx, day)
+        if slot is None:
+            return None
+        self.slots[slot, day] = ShiftPlan.free
+        self.staff_slots[staff_idx, day] = -1
+        self.free_slots[day].append(slot)
+        self.n_filled[day] -= 1
+        return slot
+
+    def reindex(self):
+        """ Rebuild the index after the slots matrix has been edited directly
+        (eg by ShiftPlan.tidy_rota). """
+        free = ShiftPlan.free
+        is_filled = self.slots != free
+        self.n_filled[:] = np.count_nonzero(is_filled, axis=0)
+        self.staff_slots[:, :] = -1
+        slots, days = np.nonzero(is_filled)
+        self.staff_slots[self.slots[slots, days], days] = slots
+        for day in range(0, self.n_days):
+            self.free_slots[day] = [int(slot) for slot in np.flatnonzero(~is_filled[:, day])[::-1]]
+        return
+
+    def tidy(self):
+        """ Tidy the rota so that each person stays on one row (ShiftPlan.tidy_rota). """
+        ShiftPlan.tidy_rota(self.slots)
+        self.reindex()
+        return
+
+    def _add_slots(self):
+        """ Double the number of slots on every day. """
+        n_slots = self.n_slots
+        new_slots = np.full((n_slots, self.n_days), ShiftPlan.free, dtype=np.int16)
+        self.slots = np.concatenate((self.slots, new_slots), axis=0)
+        for day in range(0, self.n_days):      # New slots are used after the existing free slots
+            self.free_slots[day] = list(range(2*n_slots-1, n_slots-1, -1)) + self.free_slots[day]
+        self.n_slots = 2 * n_slots
+        return
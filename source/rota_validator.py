@@ -0,0 +1,131 @@
+#!/usr/bin/python
+import numpy as np
+
+
+class RotaValidator:
+    """ Statistics and rule checks for a shift plan's rota and role matrix,
+    computed for all people and days at once with masked array reductions.
+    The availability masks and allocation limits of the staff are built once,
+    so a validator can be reused after each scheduling pass,
+        validator = RotaValidator(plan)
+        counts, violations = validator.validate(rota)
+    counts is a structured array with one record per day and violations has
+    one record per broken rule, with kind,
+        'quota'      - on console slots filled in the rota != daily slot quota
+        'blackout'   - person working (rota or timetable) on a blackout day
+        'greyout'    - person on the console rota on a greyout day
+        'max_allocation' - person allocated to the console on more than
+                       max_allocation days (md is the day the limit is passed)
+        'max_contiguous_allocation' - block of consecutive console days
+                       longer than max_contiguous_allocation (md is its start)
+    """
+    count_dtype = [('md', np.int32), ('quota', np.int16),
+                   ('rota_console', np.int16), ('rota_analyst', np.int16),
+                   ('console', np.int16), ('sme', np.int16), ('analyst', np.int16),
+                   ('kdp', np.int16), ('remote', np.int16)]
+    violation_dtype = [('kind', 'U26'), ('staff', np.int16), ('md', np.int32),
+                       ('value', np.int32), ('limit', np.int32)]
+
+    def __init__(self, plan):
+        from person import Person
+
+        self.plan = plan
+        staff = plan.staff
+        n_staff, n_days = plan.roles.shape
+        self.is_blackout = np.full((n_staff, n_days), False)
+        self.is_greyout = np.full((n_staff, n_days), False)
+        for person in staff:
+            for mask, days in [(self.is_blackout, person.blackout_days), (self.is_greyout, person.greyout_days)]:
+                days = np.array(days, dtype=int)
+                days = days[(days >= 0) & (days < n_days - 1)]      # As set in Person timetable
+                mask[person.index, days] = True
+        self.max_allocation = np.array([person.max_allocation for person in staff], dtype=np.int32)
+        self.max_contiguous_allocation = np.array([person.max_contiguous_allocation for person in staff],
+                                                  dtype=np.int32)
+        self.console_roles = [Person.role_console, Person.role_sme_console]
+        self.analyst_roles = [Person.role_analyst, Person.role_sme_analyst]
+        self.working_roles = self.console_roles + self.analyst_roles + [Person.role_kdp]
+        return
+
+    def validate(self, rota):
+        """ Count the people in each role on each day and check the rota rules.
+        :return: counts, violations - structured arrays (see class description)
+        """
+        counts = self.get_counts(rota)
+        violations = np.concatenate((self._check_quota(counts),
+                                     self._check_availability(rota),
+                                     self._check_allocation()))
+        return counts, violations
+
+    def get_counts(self, rota):
+        from person import Person
+
+        plan = self.plan
+        roles = plan.roles
+        n_days = roles.shape[1]
+        is_filled = rota != plan.free
+        rota_roles = roles[np.where(is_filled, rota, 0), np.arange(n_days)]     # Role of person in each slot
+
+        counts = np.zeros(n_days, dtype=RotaValidator.count_dtype)
+        counts['md'] = np.arange(n_days) + plan.start_md
+        counts['quota'] = plan.daily_slot_quota
+        counts['rota_console'] = np.count_nonzero(is_filled & np.isin(rota_roles, self.console_roles), axis=0)
+        counts['rota_analyst'] = np.count_nonzero(is_filled & np.isin(rota_roles, self.analyst_roles), axis=0)
+        counts['console'] = np.count_nonzero(np.isin(roles, self.console_roles), axis=0)
+        counts['sme'] = np.count_nonzero(np.isin(roles, [Person.role_sme_console, Person.role_sme_analyst]), axis=0)
+        counts['analyst'] = np.count_nonzero(np.isin(roles, self.analyst_roles), axis=0)
+        counts['kdp'] = np.count_nonzero(roles == Person.role_kdp, axis=0)
+        counts['remote'] = np.count_nonzero(roles == Person.role_remote_analyst, axis=0)
+        return counts
+
+    def _check_quota(self, counts):
+        days = np.flatnonzero(counts['rota_console'] != counts['quota'])
+        return self._make_violations('quota', -1, counts['md'][days],
+                                     counts['rota_console'][days], counts['quota'][days])
+
+    def _check_availability(self, rota):
+        plan = self.plan
+        is_rota = np.full(self.is_blackout.shape, False)      # Person is in the rota on this day
+        slots, cols = np.nonzero(rota != plan.free)
+        is_rota[rota[slots, cols], cols] = True
+        is_working = is_rota | np.isin(plan.roles, self.working_roles)
+
+        violations = []
+        for kind, is_bad in [('blackout', is_working & self.is_blackout),
+                             ('greyout', is_rota & self.is_greyout)]:
+            staff_idxs, days = np.nonzero(is_bad)
+            violations.append(self._make_violations(kind, staff_idxs, days + plan.start_md, 1, 0))
+        return np.concatenate(violations)
+
+    def _check_allocation(self):
+        plan = self.plan
+        is_console = np.isin(plan.roles, self.console_roles)
+
+        n_allocated = np.cumsum(is_console, axis=1)             # Running total of console days
+        is_over = n_allocated[:, -1] > self.max_allocation
+        staff_idxs = np.flatnonzero(is_over)
+        days = np.argmax(n_allocated[staff_idxs] > self.max_allocation[staff_idxs, None], axis=1)
+        total = self._make_violations('max_allocation', staff_idxs, days + plan.start_md,
+                                      n_allocated[staff_idxs, -1], self.max_allocation[staff_idxs])
+
+        edges = np.diff(np.pad(is_console.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        staff_idxs, starts = np.nonzero(edges == 1)             # Blocks of console days (row major, so
+        ends = np.nonzero(edges == -1)[1]                       # starts and ends pair up)
+        lengths = ends - starts
+        is_long = lengths > self.max_contiguous_allocation[staff_idxs]
+        staff_idxs = staff_idxs[is_long]
+        contiguous = self._make_violations('max_contiguous_allocation', staff_idxs,
+                                           starts[is_long] + plan.start_md, lengths[is_long],
+                                           self.max_contiguous_allocation[staff_idxs])
+        return np.concatenate((total, contiguous))
+
+    @staticmethod
+    def _make_violations(kind, staff_idxs, mds, values, limits):
+        n = len(mds)
+        violations = np.zeros(n, dtype=RotaValidator.violation_dtype)
+        violations['kind'] = kind
+        violations['staff'] = staff_idxs
+        violations['md'] = mds
+        violations['value'] = values
+        violations['limit'] = limits
+        return violations
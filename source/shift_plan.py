@@ -1,16 +1,18 @@
 #!/usr/bin/python
 #from person import Person
-from car_utils import CarUtils
-from cap_utils import CapUtils
-from kdp_utils import KdpUtils
 from tools import Tools
+from cache import Cache
+from plan_context import PlanContext
+from profiler import Profiler
 import numpy as np
 
 
 class ShiftPlan:
     """ The shift plan object manages an array (rota) with one row per shift slot
-    (6 per day) and one column per day of commissioning.  The slots are filled
-    person by person using the following rules,
+    (6 per day) and one column per day of commissioning, which holds the staff
+    index of the person in each slot (or ShiftPlan.free), and a matrix of role
+    codes with one row per person (their timetable) and one column per day.
+    The slots are filled person by person using the following rules,
     1.  For all CARs, find SMEs and schedule them for week starting 1 day before
         the CAR (2 days before SMEs 1st CAR).
     2.
@@ -22,7 +24,7 @@ class ShiftPlan:
     start_md, end_md = -3, 190
     n_days = end_md - start_md + 1
     console_rota = []
-    free = None
+    free = -1                   # Empty rota slot
 
     def __init__(self, **kwargs):
         import numpy as np
@@ -30,115 +32,125 @@ class ShiftPlan:
         comm_start_day = kwargs.get('start_day', ShiftPlan.start_md)
         comm_end_day = kwargs.get('end_day', ShiftPlan.end_md)
         n_days = comm_end_day - comm_start_day + 1
-        ShiftPlan.start_md, ShiftPlan.end_md, ShiftPlan.n_days = comm_start_day, comm_end_day, n_days
+        self.start_md, self.end_md, self.n_days = comm_start_day, comm_end_day, n_days
+        self.daily_slot_quota, self.slots_filled = None, None      # Set by create_rota
+        self.roles = None                   # Role code (uint8) of each person (row) on each day, set by read_staff
+        self.validator = None               # RotaValidator, created by test_rota
         ld_lm = ShiftPlan.launchdate_last_monday
         ShiftPlan.launchdoy_last_monday = ShiftPlan._ymd_to_doy(ShiftPlan.launchyear, ShiftPlan.launchmonth, ld_lm)
         ly, lm, ld = ShiftPlan.launchyear, ShiftPlan.launchmonth, ShiftPlan.launchdate
         ShiftPlan.launchdoy = ShiftPlan._ymd_to_doy(ly, lm, ld)
-        ShiftPlan.staff = self.read_staff()
+        PlanContext.current().plan = self
+        self.staff = self.read_staff()
         return
 
-    @staticmethod
-    def create_rota():
-        """ Create the rota array which holds Person objects for all daily slots, and
+    def create_rota(self):
+        """ Create the rota (see Rota) which holds staff indices for all daily slots, and
         a daily_slot_quota array which contains the number of people required each day (this
         can be greater/less than the baseline 10 in periods of peak/low activity).
         """
-        n_days = ShiftPlan.n_days
-        n_slots_max = 15
+        from rota import Rota
+
+        n_days = self.n_days
+        n_slots_max = 15                                                # Initial number of slots (rota grows if needed)
         n_slots_nominal = 10                                            # More slots for peak stress
         daily_slot_quota = np.full((n_days), n_slots_nominal)           # Count of slots on each day
         unusual_slots = [(-6, -1, 3), (3, 18, 11), (105, 113, 15), (165, 178, 15), (195, 200, 3)]     # L+a L+b nshifts
         for uslot in unusual_slots:
-            col1 = uslot[0] - ShiftPlan.start_md
-            col2 = uslot[1] - ShiftPlan.start_md
+            col1 = uslot[0] - self.start_md
+            col2 = uslot[1] - self.start_md
             col1 = col1 if col1 > 0 else 0
             col2 = col2 if col2 < n_days else n_days - 1
             daily_slot_quota[col1:col2+1] = uslot[2]
-        ShiftPlan.daily_slot_quota = daily_slot_quota
-        ShiftPlan.slots_filled = np.zeros(n_days)
-        rota = np.full((n_slots_max, n_days), None)        # Create empty rota
+        self.daily_slot_quota = daily_slot_quota
+        rota = Rota(n_slots_max, n_days, len(self.staff))               # Create empty rota
+        self.slots_filled = rota.n_filled                               # Kept up to date by the rota
         return rota
 
-    @staticmethod
-    def test_rota(rota):
-        """ Check rota statistics.
+    def test_rota(self, rota):
+        """ Check rota statistics, printing the days when the number of people on
+        console in the rota does not match the daily slot quota, then the other
+        broken rules (blackout, greyout and allocation limits) by person.
         :param rota:
-        :return:
+        :return: counts, violations - per day role counts and broken rules (see RotaValidator)
         """
-        from person import Person
+        from rota_validator import RotaValidator
 
         print("Testing MOC calendar")
-        daily_quota = ShiftPlan.daily_slot_quota
-        nslots, ndays = rota.shape
-        for day in range(0, ndays):
-            quota = daily_quota[day]
-            oc_counter = 0
-            an_counter = 0
-            for slot in range(0, nslots):
-                person = rota[slot, day]
-                if person != None:
-                    role = person.timetable[day]
-                    is_onconsole = role == Person.role_console
-                    is_sme_onconsole = role == Person.role_sme_console
-                    is_analyst = role == Person.role_analyst
-                    is_sme_analyst = role == Person.role_sme_analyst
-                    if is_onconsole or is_sme_onconsole:
-                        oc_counter += 1
-                    if is_analyst or is_sme_analyst:
-                        an_counter += 1
-            if quota != oc_counter:
-                fmt = "L+{:d}, on console slots filled/allocated = {:d}/{:d}, plus analyst = {:d}"
-                md = day + ShiftPlan.start_md
-                print(fmt.format(md, oc_counter, quota, an_counter))
-        return
+        if self.validator is None:
+            self.validator = RotaValidator(self)
+        counts, violations = self.validator.validate(rota)
+        fmt = "L+{:d}, on console slots filled/allocated = {:d}/{:d}, plus analyst = {:d}"
+        for day in np.flatnonzero(counts['rota_console'] != counts['quota']):
+            md, quota = int(counts['md'][day]), int(counts['quota'][day])
+            n_console, n_analyst = int(counts['rota_console'][day]), int(counts['rota_analyst'][day])
+            print(fmt.format(md, n_console, quota, n_analyst))
+        fmt = "{:s}, {:s} from L+{:d}, value/limit = {:d}/{:d}"
+        rule_violations = violations[violations['kind'] != 'quota']
+        for violation in rule_violations:
+            person = self.staff[violation['staff']]
+            print(fmt.format(person.surname, str(violation['kind']), int(violation['md']),
+                             int(violation['value']), int(violation['limit'])))
+        print("{:d} rule violations (excluding quota)".format(len(rule_violations)))
+        return counts, violations
 
     def read_staff(self):
-        from cap_utils import CapUtils
         from person import Person
 
         path = '../inputs/staff.csv'
-        with open(path, 'r') as file:
-            text_block = file.read()
-        line_list = text_block.split('\n')
-        n_lines = len(line_list)
+        staff_table = Cache.read(path, ShiftPlan._parse_staff)
+        sme_lists = Cache.unpack(staff_table['smes'], staff_table['sme_offsets'])
+        n_staff = len(staff_table['staff'])
+        self.roles = np.full((n_staff, self.n_days), Person.role_free, dtype=np.uint8)
         staff = []
+        for tokens, is_reserve, sme_tokens in zip(staff_table['staff'], staff_table['is_reserve'], sme_lists):
+            initial, forename, surname, email, organisation, colour = (str(token) for token in tokens[0:6])
+            print("Reading scheding info for {:s}".format(surname))
+            ident = initial, forename, surname, email, organisation, colour
+            max_nweeks, max_nweeks_block = (int(token) for token in tokens[6:8])
+            blackout_days = self._decode_period_token(tokens[8])
+            greyout_days = self._decode_period_token(tokens[9])
+            scheduled_days = self._decode_period_token(tokens[10])
+            analysis_days = self._decode_period_token(tokens[11])
+            availability = bool(is_reserve), max_nweeks, max_nweeks_block, blackout_days, greyout_days, scheduled_days, analysis_days
+            person = Person(ident, availability, self, len(staff))
+            for token in sme_tokens:
+                role, idt_id = token.split(':')
+                task, err_msg = PlanContext.current().registry.get(idt_id, 'CAP', 'CAR', 'KDP')
+                if task == None:
+                    print("Shift plan unable to find task {:s}".format(idt_id))
+                else:
+                    person.sme_tasks.append((task, role))
+            staff.append(person)
+        return staff
+
+    @staticmethod
+    def _parse_staff(path):
+        """ Read the identity, availability and SME task tokens for each person
+        in 'staff.csv'.  People listed after the 'Reserve' line are flagged as
+        reserves.
+        """
+        staff_rows, reserves, sme_lists = [], [], []
         is_reserve = False
-        for row in range(1, n_lines):
-            tokens = line_list[row].split(',')
+        for line in Tools.read_lines(path, n_header_lines=1):
+            tokens = line.split(',')
             if tokens[0] == 'End':
                 break
             else:
                 if tokens[0] == 'Reserve':
                     is_reserve = True
-                    row += 1
                 else:
-                    initial, forename, surname, email, organisation = (token.strip() for token in tokens[0:5])
-                    print("Reading scheding info for {:s}".format(surname))
-                    colour = tokens[5]
-                    ident = initial, forename, surname, email, organisation, colour
-                    max_nweeks, max_nweeks_block  = (int(token.strip()) for token in tokens[6:8])
-                    blackout_days = ShiftPlan._decode_period_token(tokens[8])
-                    greyout_days = ShiftPlan._decode_period_token(tokens[9])
-                    scheduled_days = ShiftPlan._decode_period_token(tokens[10])
-                    analysis_days = ShiftPlan._decode_period_token(tokens[11])
-                    availability = is_reserve, max_nweeks, max_nweeks_block, blackout_days, greyout_days, scheduled_days, analysis_days
-                    person = Person(ident, availability)
-                    for token in tokens[12:]:
-                        token = token.strip()
-                        if len(token) > 2:
-                            role, idt_id = token.split(':')
-                            task, err_msg = CapUtils.get_cap(idt_id)
-                            if task == None:
-                                task, err_msg = CarUtils.get_car(idt_id)
-                                if task == None:
-                                    task, err_msg = KdpUtils.get_kdp(idt_id)
-                            if task == None:
-                                print("Shift plan unable to find task {:s}".format(idt_id))
-                            else:
-                                person.sme_tasks.append((task, role))
-                    staff.append(person)
-        return staff
+                    ident_tokens = [token.strip() for token in tokens[0:5]] + [tokens[5]]
+                    max_tokens = [token.strip() for token in tokens[6:8]]
+                    staff_rows.append(ident_tokens + max_tokens + tokens[8:12])
+                    reserves.append(is_reserve)
+                    sme_tokens = [token.strip() for token in tokens[12:]]
+                    sme_lists.append([token for token in sme_tokens if len(token) > 2])
+        smes, sme_offsets = Cache.pack(sme_lists)
+        staff_table = {'staff': np.array(staff_rows, dtype=str).reshape(-1, 12),
+                       'is_reserve': np.array(reserves, dtype=bool),
+                       'smes': smes, 'sme_offsets': sme_offsets}
+        return staff_table
 
     @staticmethod
     def get_task_header_string(label, **kwargs):
@@ -149,8 +161,7 @@ class ShiftPlan:
         str = fmt.format('CARs')
         return str
 
-    @staticmethod
-    def print(**kwargs):
+    def print(self, **kwargs):
         """ Print the shift plan. If parameter to_csv=True, the plan is written
         in csv format to file 'outputs\shift_plan_basis.csv'
         """
@@ -161,12 +172,12 @@ class ShiftPlan:
         if to_csv:
             csv_file = "../outputs/shift_plan_basis.csv"
             csv = open(csv_file, 'w')
-        att_hdr = Person.get_attendance_header_string(**kwargs)
+        att_hdr = Person.get_attendance_header_string(self, **kwargs)
         header_str = Person.get_header_string(**kwargs) + att_hdr
         if to_csv:
             csv.write(header_str + '\n')
         print(header_str)
-        staff = ShiftPlan.staff
+        staff = self.staff
         for person in staff:
             person_str = person.get_string(**kwargs)
             attendance_str = person.get_attendance_string(**kwargs)
@@ -179,7 +190,7 @@ class ShiftPlan:
         if to_csv:
             csv.write(header_str + '\n')
         print(header_str)
-        tasks = CarUtils.cars
+        tasks = PlanContext.current().cars
         n_car_rows = 25
         car_texts = []
         row_idxs = []
@@ -189,7 +200,7 @@ class ShiftPlan:
             car_text += "{:>6s}".format('|')
             car_texts.append(car_text)
             row_idxs.append(0)
-        t_soc = ShiftPlan.start_md     # Start of commissioning
+        t_soc = self.start_md     # Start of commissioning
         row = 0
         for task in tasks:
             car_text, row_idx = car_texts[row], row_idxs[row]
@@ -225,87 +236,102 @@ class ShiftPlan:
             csv.close()
         return
 
-    @staticmethod
-    def allocate_tasks(rota, task_type):
+    def allocate_tasks(self, rota, task_type):
         from person import Person
-        staff = ShiftPlan.staff
+        staff = self.staff
         for person in staff:        # Combine personal timetables into a rota
             rota = person.schedule_tasks(rota, task_type)
         return rota
 
-    @staticmethod
-    def build_analysis_rota():
+    def build_analysis_rota(self):
         from person import Person
-        staff = ShiftPlan.staff
         n_slots_max = 15            # No more than 15 analysts per day (plotting restriction!)
-        n_days = ShiftPlan.n_days
-        a_rota = np.full((n_slots_max, n_days), None)
-        for person in staff:
-            for col, role in enumerate(person.timetable):
-                is_analyst = role == Person.role_analyst or role == Person.role_sme_analyst
-                if is_analyst:
-                    for slot in range(0, n_slots_max):
-                        if a_rota[slot, col] == None:
-                            a_rota[slot, col] = person
-                            break
+        n_days = self.n_days
+        a_rota = np.full((n_slots_max, n_days), ShiftPlan.free, dtype=np.int16)
+        is_analyst = np.isin(self.roles, [Person.role_analyst, Person.role_sme_analyst])
+        slots = np.cumsum(is_analyst, axis=0) - 1       # Analysts fill each day's slots in staff order
+        is_placed = is_analyst & (slots < n_slots_max)
+        staff_idxs, cols = np.nonzero(is_placed)
+        a_rota[slots[staff_idxs, cols], cols] = staff_idxs
         return a_rota
 
-    @staticmethod
-    def allocate_prescheduled(rota):
+    def allocate_prescheduled(self, rota):
         """ Allocate the days in each person's timetable which are prescheduled to be on shift. """
-        staff = ShiftPlan.staff
+        staff = self.staff
         for person in staff:
             rota = person.schedule_forced(rota)
         return rota
 
-    @staticmethod
-    def allocate_remaining(rota):
-        staff = ShiftPlan.staff
+    def allocate_remaining(self, rota):
+        staff = self.staff
         for person in staff:
             rota = person.schedule_remaining(rota)
         return rota
 
-    @staticmethod
-    def remove_singles(rota):
-        n_rows, n_days = rota.shape
-        daily_slots = ShiftPlan.daily_slot_quota
+    def remove_singles(self, rota):
+        slots = rota.slots
+        n_rows, n_days = slots.shape
+        daily_slots = self.daily_slot_quota
+        staff = self.staff
         for row in range(0, n_rows):
-            yesterday = rota[row, 0]
+            yesterday = slots[row, 0]
             count = 1
             for col in range(1, n_days - 1):
                 n_slots = daily_slots[col]
-                today = rota[row, col]
+                today = slots[row, col]
                 if today == yesterday:
                     count += 1
                 else:
-                    tomorrow = rota[row, col+1]
-                    if tomorrow is not None:
+                    tomorrow = slots[row, col+1]
+                    if tomorrow != ShiftPlan.free:
                         if tomorrow != today:
-                            if tomorrow in rota[0:n_slots, col]:
-                                print('{:s} already scheduled on day {:d}'.format(tomorrow.surname, col))
+                            person = staff[tomorrow]
+                            if tomorrow in slots[0:n_slots, col]:
+                                print('{:s} already scheduled on day {:d}'.format(person.surname, col))
                             else:
-                                rota[row, col] = tomorrow
-                                tomorrow.timetable[col] = tomorrow.role_console
+                                slots[row, col] = tomorrow
+                                person.set_role(col, person.role_console)
                         count = 1
                 yesterday = today
+        rota.reindex()
         return rota
 
     @staticmethod
     def tidy_rota(rota):
-        """ Tidy up rota by placing each person's allocated days on a single row """
+        """ Tidy up rota by placing each person's allocated days on a single row.
+        Each block of consecutive days that a person is in the rota is an interval,
+        and the intervals are given rows in order of their start day, taking the
+        lowest row which is free on that day (interval colouring, using heaps
+        of the free rows and of the rows in use ordered by their end day).
+        """
+        import heapq
+
+        free = ShiftPlan.free
         n_rows, n_days = rota.shape
-        for day in range(0, n_days-1):
-            for row in range(0, n_rows):
-                person = rota[row, day]
-                for tom_row in range(0, n_rows):
-                    tom_person = rota[tom_row, day + 1]
-                    if tom_person == person:    # Person also on tomorrow, swap rows tomorrow
-                        rota[tom_row, day+1] = rota[row, day+1]
-                        rota[row, day+1] = person
+        slots, cols = np.nonzero(rota != free)
+        staff_idxs = rota[slots, cols]
+        n_staff = int(staff_idxs.max()) + 1 if len(staff_idxs) > 0 else 0
+        is_on = np.zeros((n_staff, n_days + 2), dtype=np.int8)     # Padded with a free day at each end
+        is_on[staff_idxs, cols + 1] = 1
+        edges = np.diff(is_on, axis=1)
+        block_staff, starts = np.nonzero(edges == 1)               # Row major, so starts and ends pair up
+        ends = np.nonzero(edges == -1)[1]                           # Day after end of block
+        order = np.lexsort((block_staff, starts))
+
+        rota[:, :] = free
+        free_rows = list(range(0, n_rows))
+        used_rows = []                                              # (end day, row)
+        for i in order:
+            start, end = starts[i], ends[i]
+            while len(used_rows) > 0 and used_rows[0][0] <= start:
+                end_used, row = heapq.heappop(used_rows)
+                heapq.heappush(free_rows, row)
+            row = heapq.heappop(free_rows)
+            rota[row, start:end] = block_staff[i]
+            heapq.heappush(used_rows, (end, row))
         return rota
 
-    @staticmethod
-    def _plot_calendar_grid(n_panes, xrange, yrange, **kwargs):
+    def _plot_calendar_grid(self, n_panes, xrange, yrange, **kwargs):
         from plot_utils import Plot
         import calendar
         import datetime
@@ -317,7 +343,7 @@ class ShiftPlan:
                                       ncols=1, nrows=n_panes, fontsize=16,
                                       plotpad=plotpad)
         y_pitch = (0.008, 0.012, 0.016)[n_panes-1] * yrange
-        xorg = ShiftPlan.start_md
+        xorg = self.start_md
         xlm = ShiftPlan.launchdoy_last_monday - ShiftPlan.launchdoy
         for pane in range(0, n_panes):
             ax = axs[pane, 0]
@@ -371,7 +397,7 @@ class ShiftPlan:
                 if month > 12:
                     year += 1
                     month = 1
-                is_more = xdom < ShiftPlan.n_days
+                is_more = xdom < self.n_days
             xmd = xl                        # Align L+day text with launch phase
             fmt = "L+{:d}"
             while xmd < xmax:
@@ -383,8 +409,7 @@ class ShiftPlan:
                 xmd += 10
         return fig, axs
 
-    @staticmethod
-    def plot_rota(rota, filename, **kwargs):
+    def plot_rota(self, rota, filename, **kwargs):
         from plot_utils import Plot
         import matplotlib.transforms as mtransforms
         from matplotlib.patches import Polygon, Rectangle, Circle
@@ -397,12 +422,13 @@ class ShiftPlan:
             link_colour, title = 'green', 'Analysis/Support Rota'
 
         n_panes, xrange, yrange = 3, 70, 105         # Calendar; 3 panes, 105 rows, 70 days/plot
-        fig, axs = ShiftPlan._plot_calendar_grid(n_panes, xrange, yrange)
+        fig, axs = self._plot_calendar_grid(n_panes, xrange, yrange)
         fig.suptitle(title)
 
         free = ShiftPlan.free
+        staff = self.staff
         n_slots, n_days = rota.shape
-        xorg = ShiftPlan.start_md
+        xorg = self.start_md
         yorg = 32                                   # Plot CARs above midline and rota below
         ybarheight = 2.0
         launch_phase = ShiftPlan.launchhour / 24.0  # Fraction of day
@@ -425,8 +451,9 @@ class ShiftPlan:
                     on_today = rota[slot, day]
                     if on_today != on_yesterday:    # Change of shift for this slot
                         if on_yesterday != free:    # Close out last person
-                            bar_colour = on_yesterday.bar_colour
-                            text_colour = on_yesterday.fg_colour
+                            person = staff[on_yesterday]
+                            bar_colour = person.bar_colour
+                            text_colour = person.fg_colour
                             if x >= xmin:
                                 xoff = x if x < xmax else xmax
                                 xon = xon if x > xmin else xmin
@@ -435,10 +462,10 @@ class ShiftPlan:
                                     bar_args = {'angle':0.0, 'fill':True, 'fc':bar_colour, 'edgecolor':'white'}
                                     bar = Rectangle((xon, ybar), xw, 0.9 * ybarheight, **bar_args)
                                     ax.add_patch(bar)
-                                    bartext = on_yesterday.surname
+                                    bartext = person.surname
                                     ax.text(xon, ybar, bartext, fontsize=18,
                                             ha='left', va='bottom', color=text_colour)
-                                    sme_tasks = on_yesterday.sme_tasks     # Plot SME tasks on timeline
+                                    sme_tasks = person.sme_tasks     # Plot SME tasks on timeline
                                     for task, role in sme_tasks:
                                         xstart = task.t_start + launch_phase
                                         ybarmid = ybar + 0.5 * ybarheight
@@ -453,9 +480,8 @@ class ShiftPlan:
             n_task_slots = 26
             ytaskheight = 2.5
             slot = 0
-            cars = CarUtils.cars
-            caps = CapUtils.caps
-            kdps = KdpUtils.kdps
+            ctx = PlanContext.current()
+            cars, caps, kdps = ctx.cars, ctx.caps, ctx.kdps
             tasks = ShiftPlan.merge_tasks(cars, caps)
             tasks = ShiftPlan.merge_tasks(tasks, kdps)
             for task in tasks:
@@ -481,21 +507,23 @@ class ShiftPlan:
                     slot = 0
 
         filepath = '../outputs/' + filename + '.png'
+        Profiler.record_figure(fig, name=filename)
         fig.savefig(filepath)
+        Plot.clear(fig)
         return
 
-    @staticmethod
-    def plot_staff_schedules(**kwargs):
+    def plot_staff_schedules(self, **kwargs):
+        from plot_utils import Plot
         from matplotlib.patches import Polygon, Rectangle, Circle
 
         name = kwargs.get('name', 'staff_schedule.png')
         show_greyout = kwargs.get('show_greyout', True)
 
         n_panes, xrange, yrange = 2, 105, 130
-        fig, axs = ShiftPlan._plot_calendar_grid(n_panes, xrange, yrange, plotpad=10.0)
-        xorg = ShiftPlan.start_md
+        fig, axs = self._plot_calendar_grid(n_panes, xrange, yrange, plotpad=10.0)
+        xorg = self.start_md
 
-        staff = ShiftPlan.staff
+        staff = self.staff
         ybarheight = 2.0
 
         for pane in range(0, n_panes):
@@ -518,11 +546,11 @@ class ShiftPlan:
                     yg = ybar + 0.7 * ybarheight
                     ax.plot([xlim[0], xlim[1]], [yg, yg], color='grey', lw=2.5)
                     ybar -= 0.5 * ybarheight
-                role_yesterday = ''
+                role_yesterday = None
                 xon = xmin
                 for day, role_today in enumerate(person.timetable):
                     x = day + xorg
-                    if role_today != role_yesterday or day == ShiftPlan.n_days - 1:        # Draw the 'old' bar and start a new one
+                    if role_today != role_yesterday or day == self.n_days - 1:        # Draw the 'old' bar and start a new one
                         if x >= xmin:
                             xoff = x if x <= xmax else xmax
                             xw = xoff - xon
@@ -554,11 +582,12 @@ class ShiftPlan:
                 ax.add_patch(bar)
 
         filepath = '../outputs/' + name
+        Profiler.record_figure(fig, name=name)
         fig.savefig(filepath)
+        Plot.clear(fig)
         return
 
-    @staticmethod
-    def _decode_period_token(token):
+    def _decode_period_token(self, token):
         """ Create an array containing the index (column number) of the day in the rota
         object from a period date token (format 'yyyymmdd:yyyymmdd').
         :param token: Date token.  eg '20211220:20220109'
@@ -576,7 +605,7 @@ class ShiftPlan:
                     md_start = ShiftPlan._ymd_to_md(2000 + int(t[0:2]), int(t[2:4]), int(t[4:6]))
                     md_end = ShiftPlan._ymd_to_md(2000 + int(t[7:9]), int(t[9:11]), int(t[11:13]))
                 for md in np.arange(md_start, md_end + 1):
-                    day_idx = md - ShiftPlan.start_md
+                    day_idx = md - self.start_md
                     days.append(day_idx)
         return days
 
@@ -1,21 +1,20 @@
 import numpy as np
 from loom import Loom
+from plan_context import PlanContext
 
 class Task:
     """ Task contains the parameters for a single CAP, CAR or KDP (milestone).
     """
     # Define class globals
     n_inputs, n_outputs = 8, 8              # Number of connector i/o sites
-    uid_counter = 0
-    free_uid = 'UID-tbd'
     box_w, box_h = 50.0, 25.0               # Box width, height
     inset_w, inset_h = 8.0, 20.0
     socket_pitch = 4.0
     task = 'TBD'
+    socket_templates = {}                   # {task type: socket positions}, see _get_socket_template
 
     def __init__(self, idt_id, label, colour):
-        self.uid = "TSK{:04d}".format(Task.uid_counter)
-        Task.uid_counter += 1
+        self.uid = PlanContext.current().next_uid('TSK')
         self.idt_id = idt_id
         self.label = label
         self.colour = colour
@@ -45,10 +44,28 @@ class Task:
         return None, err_msg
 
     def setup_sockets(self):
-        """ Add sockets, 1 on left and right face and n on the bottom socket
-        format is 'face', 'loom_uid', dx, dy, where dx, dy are offsets from the
-        bottom left of the box.
+        """ Set up the (free) sockets of this task.  The socket positions are
+        held in a template which is shared by all tasks of the same type, while
+        each task holds the index of the loom plugged into each socket (-1 =
+        free), the number of sockets in use on each face and a map from loom to
+        socket.
         """
+        template = Task._get_socket_template(self.type)
+        n_sockets = len(template['xy'])
+        self.socket_looms = np.full(n_sockets, -1, dtype=np.int32)
+        self.socket_next = np.zeros(len(template['faces']), dtype=np.int32)   # Next free socket on each face
+        self.socket_map = {}                # {(loom index, face): socket index}
+        return
+
+    @staticmethod
+    def _get_socket_template(task_type):
+        """ Socket positions, 1 on left and right face and n on the bottom,
+        as dx, dy offsets from the bottom left of the box, with the index of the
+        first socket and number of sockets on each face.
+        """
+        template = Task.socket_templates.get(task_type, None)
+        if template is not None:
+            return template
         w, h = Task.box_w, Task.box_h
         p = Task.socket_pitch
         faces = ['l', 'b', 'tl', 'tr', 'r']
@@ -58,44 +75,45 @@ class Task:
         x_pitches = [0.0, p, p, -p, 0.0]
         y_pitches = [p, 0.0, 0.0, 0.0, -p]
         n_faces = len(faces)
-        sockets = []
+        xy = []
+        face_dict = {}                      # {face: (face index, first socket, number of sockets)}
         for i in range(0, n_faces):
             face = faces[i]
             x_org, y_org = x_orgs[i], y_orgs[i]
             x_pitch, y_pitch = x_pitches[i], y_pitches[i]
             n_sockets = n_sockets_face[i]
+            face_dict[face] = i, len(xy), n_sockets
             for j in range(0, n_sockets):
                 x = x_org + j * x_pitch
                 y = y_org + j * y_pitch
-                sockets.append([face, Task.free_uid, x, y])
-        self.sockets = sockets
-        return
-
-    def get_socket(self, loom_uid, **kwargs):
-        """ Get a free output connector for a connecting loom
+                xy.append([x, y])
+        xy = np.array(xy)
+        xy.setflags(write=False)            # Shared by all tasks of this type
+        template = {'faces': face_dict, 'xy': xy}
+        Task.socket_templates[task_type] = template
+        return template
+
+    def get_socket(self, loom, **kwargs):
+        """ Get a free output connector for a connecting loom, or the one
+        already assigned to it.
         """
-        from conduit import Conduit
-
         face = kwargs.get('face', 'b')      # (b)ottom, (l)eft, (r)ight (t)op
-        i_free = -1                         # Index of first free socket
-        i_ass = -1                          # Index of socket pre-assigned to this loom
-        n_sockets = len(self.sockets)
-        for i in range(0, n_sockets):       # Check all sockets on selected face for this loom
-            socket = self.sockets[i]
-            if socket[0] == face:
-                is_first_free = socket[1] == Loom.free_uid and i_free == -1
-                i_free = i if is_first_free else i_free
-                is_pre_ass = socket[1] == loom_uid
-                i_ass = i if is_pre_ass else i_ass
-        i = i_ass if i_ass != -1 else i_free
-        x, y = 0., 0.
-        if i_free != -1:
-            socket = self.sockets[i]
-            x = self.box_x + socket[2]
-            y = self.box_y + socket[3]
-            self.sockets[i][1] = loom_uid
-        else:
-            print('t.get_socket - Socket {:s} not found !!'.format(face))
+        template = Task._get_socket_template(self.type)
+        key = loom.index, face
+        i = self.socket_map.get(key, None)  # Socket pre-assigned to this loom
+        if i is None:
+            i_face, i_first, n_face_sockets = template['faces'][face]
+            n_used = self.socket_next[i_face]
+            if n_used == n_face_sockets:
+                print('t.get_socket - Socket {:s} not found !!'.format(face))
+                return 0., 0.
+            i = i_first + n_used
+            self.socket_next[i_face] = n_used + 1
+            self.socket_looms[i] = loom.index
+            self.socket_map[key] = i
+        dx, dy = template['xy'][i]
+        x = self.box_x + dx
+        y = self.box_y + dy
         return x, y
 
     def _set_box_layout(self, **kwargs):
@@ -131,10 +149,8 @@ class Task:
         self.sinks = sinks
         return
 
-    def set_position(self):
-        from conduit import Conduit
-
-        x, y, w, h = Conduit.get_cell_rectangle(self.row, self.col)
+    def set_position(self, conduit):
+        x, y, w, h = conduit.get_cell_rectangle(self.row, self.col)
         box_x = x + self.inset_w
         box_y = y + self.inset_h
         self.box_x, self.box_y = box_x, box_y
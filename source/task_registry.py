@@ -0,0 +1,71 @@
+#!/usr/bin/python
+class TaskRegistry:
+    """ Index of the CARs, CAPs and KDPs in the plan, keyed by task type and
+    idt_id, with secondary indexes by NG CAR id and by type.  Tasks must be
+    renamed and removed through the registry to keep the indexes in step.
+    """
+    def __init__(self):
+        self.by_idt = {}            # {type: {idt_id: [tasks]}}, tasks held in registration order
+        self.by_ng = {}             # {ng_id: [tasks]}
+        self.by_type = {}           # {type: {id(task): task}}
+        return
+
+    def add(self, task):
+        self.by_idt.setdefault(task.type, {}).setdefault(task.idt_id, []).append(task)
+        ng_id = getattr(task, 'ng_id', None)
+        if ng_id is not None:
+            self.by_ng.setdefault(ng_id, []).append(task)
+        self.by_type.setdefault(task.type, {})[id(task)] = task
+        return
+
+    def remove(self, task):
+        TaskRegistry._discard(self.by_idt.get(task.type, {}), task.idt_id, task)
+        ng_id = getattr(task, 'ng_id', None)
+        if ng_id is not None:
+            TaskRegistry._discard(self.by_ng, ng_id, task)
+        self.by_type.get(task.type, {}).pop(id(task), None)
+        return
+
+    def rename(self, task, new_idt_id):
+        """ Change the idt_id of a registered task. """
+        self.remove(task)
+        task.idt_id = new_idt_id
+        self.add(task)
+        return
+
+    def clear(self, task_type):
+        """ Remove all tasks of one type (eg before re-reading the CARs). """
+        for task in list(self.by_type.get(task_type, {}).values()):
+            self.remove(task)
+        return
+
+    def get(self, idt_id, *task_types):
+        """ Find the first registered task with this idt_id, searching the task
+        types in the order given (default is all types).
+        :return: task, err_msg (None, err_msg if not found)
+        """
+        task_types = task_types if len(task_types) > 0 else list(self.by_idt.keys())
+        for task_type in task_types:
+            tasks = self.by_idt.get(task_type, {}).get(idt_id, None)
+            if tasks:
+                return tasks[0], None
+        err_msg = '{:s} not found !!'.format(idt_id)
+        return None, err_msg
+
+    def get_by_ng_id(self, ng_id):
+        """ All CARs with this NG CAR id. """
+        return list(self.by_ng.get(ng_id, []))
+
+    def get_all(self, task_type):
+        return list(self.by_type.get(task_type, {}).values())
+
+    @staticmethod
+    def _discard(index, key, task):
+        tasks = index.get(key, [])
+        for i, t in enumerate(tasks):
+            if t is task:
+                del tasks[i]
+                break
+        if len(tasks) == 0:
+            index.pop(key, None)
+        return
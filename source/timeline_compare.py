@@ -0,0 +1,133 @@
+#!/usr/bin/python
+""" Programme to compare the start times and durations of the MIRI CARs in
+several versions of the CAWG commissioning timeline.  For example,
+    python timeline_compare.py 2021Sept_Working_Commissioning_Timeline.csv flight_timeline_ag220323.csv
+writes the changes relative to the first (reference) version to file
+'outputs/timeline_changes.csv'.
+"""
+import numpy as np
+
+
+class TimelineCompare:
+    """ Read several versions of the CAWG timeline concurrently in a pool of
+    worker processes and build a table of the changes to the start time and
+    duration of each MIRI CAR, relative to the first version.
+    """
+    cawg_path = '../inputs/'
+    csv_path = '../outputs/timeline_changes.csv'
+
+    def __init__(self):
+        return
+
+    @staticmethod
+    def compare(timeline_files, **kwargs):
+        """ Compare timeline versions.  CARs are matched by ng_id and idt_id
+        (and by order of appearance for CARs which appear more than once).
+        :return: version_names, diff - structured array with one record per CAR
+        and fields ng_id, idt_id, t_start, t_dur (hr), d_start, d_dur (hr), each
+        time field holding one column per version (NaN where a CAR is missing).
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        n_workers = kwargs.get('n_workers', None)
+        paths = [TimelineCompare.cawg_path + timeline_file for timeline_file in timeline_files]
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            versions = list(pool.map(TimelineCompare._read_version, paths))
+        diff = TimelineCompare._diff(versions)
+        return timeline_files, diff
+
+    @staticmethod
+    def _read_version(path):
+        """ Worker task. Read one timeline and return its MIRI CARs as a
+        structured array (key, ng_id, idt_id, t_start, t_dur).
+        """
+        import contextlib
+        import io
+        from car_utils import CarUtils
+
+        with contextlib.redirect_stdout(io.StringIO()):     # Suppress progress messages
+            cars = CarUtils.read_timeline(path)
+        counts = {}
+        records = []
+        for car in cars:
+            n = counts.get((car.ng_id, car.idt_id), 0)
+            counts[(car.ng_id, car.idt_id)] = n + 1
+            key = "{:s}|{:s}|{:d}".format(car.ng_id, car.idt_id, n)
+            records.append((key, car.ng_id, car.idt_id, car.t_start, car.t_dur_cawg))
+        dtype = [('key', 'U64'), ('ng_id', 'U16'), ('idt_id', 'U24'), ('t_start', 'f8'), ('t_dur', 'f8')]
+        return np.array(records, dtype=dtype)
+
+    @staticmethod
+    def _diff(versions):
+        """ Merge the CAR tables from all versions and calculate the changes
+        relative to the first version.
+        """
+        n_versions = len(versions)
+        all_keys = np.concatenate([version['key'] for version in versions])
+        keys, first_idxs = np.unique(all_keys, return_index=True)
+        n_cars = len(keys)
+        t_start = np.full((n_cars, n_versions), np.nan)
+        t_dur = np.full((n_cars, n_versions), np.nan)
+        for v, version in enumerate(versions):
+            idxs = np.searchsorted(keys, version['key'])
+            t_start[idxs, v] = version['t_start']
+            t_dur[idxs, v] = version['t_dur']
+        all_ng_ids = np.concatenate([version['ng_id'] for version in versions])
+        all_idt_ids = np.concatenate([version['idt_id'] for version in versions])
+
+        dtype = [('ng_id', 'U16'), ('idt_id', 'U24'),
+                 ('t_start', 'f8', (n_versions,)), ('t_dur', 'f8', (n_versions,)),
+                 ('d_start', 'f8', (n_versions,)), ('d_dur', 'f8', (n_versions,))]
+        diff = np.zeros(n_cars, dtype=dtype)
+        diff['ng_id'] = all_ng_ids[first_idxs]
+        diff['idt_id'] = all_idt_ids[first_idxs]
+        diff['t_start'] = t_start
+        diff['t_dur'] = t_dur
+        diff['d_start'] = t_start - t_start[:, 0:1]
+        diff['d_dur'] = t_dur - t_dur[:, 0:1]
+
+        t_order = np.nanmin(np.where(np.isnan(t_start), np.inf, t_start), axis=1)    # Earliest start in any version
+        diff = diff[np.argsort(t_order, kind='stable')]
+        return diff
+
+    @staticmethod
+    def write_csv(version_names, diff, **kwargs):
+        """ Write the CAR start time (L+day) and duration (hr) in each version,
+        with the change from the reference (first) version.
+        """
+        path = kwargs.get('path', TimelineCompare.csv_path)
+        tags = ['L+day', 'dL+day', 'Dur/hr', 'dDur/hr']
+        hdr = "{:<10s},{:<12s}".format('NG ID', 'IDT ID')
+        for name in version_names:
+            for tag in tags:
+                hdr += ",{:>10s}".format(tag)
+        block_width = 11 * len(tags)                # Width of one version's columns (',' + 10 chars each)
+        name_fmt = "{:<" + str(block_width - 1) + "s}"  # Version name cell, after its separating ','
+        with open(path, 'w') as csv_file:
+            csv_file.write(','.join(["{:<23s}".format('')] + [name_fmt.format(name) for name in version_names]) + '\n')
+            csv_file.write(hdr + '\n')
+            for record in diff:
+                line = "{:<10s},{:<12s}".format(record['ng_id'], record['idt_id'])
+                for v in range(0, len(version_names)):
+                    vals = record['t_start'][v], record['d_start'][v], record['t_dur'][v], record['d_dur'][v]
+                    for val in vals:
+                        line += ",{:10.2f}".format(val) if not np.isnan(val) else ",{:>10s}".format('-')
+                csv_file.write(line + '\n')
+        return
+
+
+if __name__ == "__main__":
+    import sys
+
+    timeline_files = sys.argv[1:]
+    if len(timeline_files) == 0:        # Default is to compare all archived CAWG timelines
+        timeline_files = ["2021June_Working_Commissioning_Timeline.csv",
+                          "2021Sept_Working_Commissioning_Timeline.csv",
+                          "2021Nov_Working_Commissioning_Timeline.csv",
+                          "flight_timeline_ag220323.csv"]
+    print('Comparing CAWG timelines ' + ', '.join(timeline_files))
+    version_names, diff = TimelineCompare.compare(timeline_files)
+    changed = np.any(np.abs(np.nan_to_num(diff['d_start'])) > 0.0, axis=1)
+    print('{:d} MIRI CARs found, {:d} with changed start times'.format(len(diff), int(np.sum(changed))))
+    TimelineCompare.write_csv(version_names, diff)
+    print('Changes written to ' + TimelineCompare.csv_path)
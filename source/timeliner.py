@@ -1,15 +1,16 @@
 """ Programme to read in '.csv' formatted copies of the commissioning timeline
 and MIRI shift plan and generate schedules to include the timing of CARs and
-CAPs with staff availability.
+CAPs with staff availability.  Run with option '--no-plots' to write only the
+'.csv' outputs, in which case the plotting modules (matplotlib) are not loaded,
+and with option '--profile' to write a report of the time spent in each stage.
 """
 from car_utils import CarUtils
 from cap_utils import CapUtils
-from person import Person
 from shift_plan import ShiftPlan
-from plot_utils import Plot
 from kdp_utils import KdpUtils
-from dataflow import DataFlow
 from tools import Tools
+from plan_context import PlanContext
+from profiler import Profiler
 
 cawg_path = "../inputs/"
 cawg_date = "2021_07"
@@ -20,54 +21,135 @@ staff_file = "staff.csv"
 apt_data_file = "../inputs/apt_decoder_data.csv"
 car_obs_file = "../inputs/car_obs_table.csv"
 
-tools = Tools()
-car_utils = CarUtils()
-
-timeline_path = cawg_path + timeline_file
-print('Reading CAWG timeline from {:s}'.format(timeline_path))
-raw_cars = CarUtils.read_timeline(timeline_path)
-CarUtils.patch_cars(raw_cars)
-
-cars = CarUtils.cars
-cap_utils = CapUtils()
-caps = CapUtils.caps
-
-CarUtils.add_caps_to_cars(cars, caps)
-CarUtils.add_apt_times_to_cars(cars, car_obs_file, apt_data_file)
-CarUtils.print()
-
-kdp_utils = KdpUtils()
-KdpUtils.schedule_kdps()
-kdps = KdpUtils.kdps
-
-print()
-dataflow = True        # True = Replot dataflow diagrams
-if dataflow:
-    dataflow = DataFlow()
-    dc_keys = DataFlow.col_dict.keys()
-    for dc_key in dc_keys:
-        print('Plotting ' + dc_key)
-        dataflow.plot_dataflow(cars, caps, kdps, cawg_date, kdp_id=dc_key)
-
-print("Building shift plan")
-plan = ShiftPlan()
-rota = ShiftPlan.create_rota()
-rota = ShiftPlan.allocate_prescheduled(rota)
-rota = ShiftPlan.allocate_tasks(rota, 'CAP')
-rota = ShiftPlan.allocate_tasks(rota, 'KDP')
-rota = ShiftPlan.allocate_tasks(rota, 'CAR')
-rota = ShiftPlan.allocate_remaining(rota)
-ShiftPlan.plot_staff_schedules(name='s4.png')
-ShiftPlan.plot_staff_schedules(name='s5.png')
-rota = ShiftPlan.tidy_rota(rota)
-ShiftPlan.test_rota(rota)
-a_rota = ShiftPlan.build_analysis_rota()
-a_rota = ShiftPlan.tidy_rota(a_rota)
-
-ShiftPlan.plot_rota(a_rota, 'analysis_rota', is_analysis=True)
-ShiftPlan.plot_staff_schedules(name='staff_calendar.png', show_greyout=False)
-ShiftPlan.plot_rota(rota, 'moc_rota')
-
-ShiftPlan.print(to_csv=True)
-
-print('timeliner - finished')
+
+def main(args):
+    plots = not args.no_plots           # False = Skip the dataflow diagrams and rota plots
+    Profiler.enabled = args.profile
+
+    tools = Tools()
+    ctx = PlanContext.current()
+    car_utils = CarUtils()
+
+    timeline_path = cawg_path + timeline_file
+    print('Reading CAWG timeline from {:s}'.format(timeline_path))
+    if args.stream:             # Cars are read (and counted) as patch_cars takes them, so one stage
+        with Profiler.stage('read_timeline+patch_cars') as stage:
+            CarUtils.patch_cars(CarUtils.stream_timeline(timeline_path, stats=stage))
+    else:
+        with Profiler.stage('read_timeline') as stage:
+            raw_cars = CarUtils.read_timeline(timeline_path)
+            stage['n_items'] = len(raw_cars)
+        with Profiler.stage('patch_cars') as stage:
+            CarUtils.patch_cars(raw_cars)
+            stage['n_items'] = len(ctx.cars)
+
+    cars = ctx.cars
+    with Profiler.stage('read_caps') as stage:
+        cap_utils = CapUtils()
+        stage['n_items'] = len(ctx.caps)
+    caps = ctx.caps
+
+    with Profiler.stage('add_caps_to_cars', n_items=len(cars)):
+        CarUtils.add_caps_to_cars(cars, caps)
+    with Profiler.stage('add_apt_times_to_cars', n_items=len(cars)):
+        CarUtils.add_apt_times_to_cars(cars, car_obs_file, apt_data_file)
+    with Profiler.stage('print_cars', n_items=len(cars)):
+        CarUtils.print()
+
+    with Profiler.stage('read_kdps') as stage:
+        kdp_utils = KdpUtils()
+        KdpUtils.schedule_kdps()
+        stage['n_items'] = len(ctx.kdps)
+    kdps = ctx.kdps
+
+    print()
+    if plots:                   # Replot dataflow diagrams
+        from dataflow import DataFlow
+
+        dataflow = DataFlow()
+        dc_keys = DataFlow.get_diagram_ids(kdps)
+        manifest = {} if args.replot else DataFlow.read_manifest()     # Fingerprints of existing diagrams
+        options = {'fmt': args.format, 'dpi': args.dpi, 'preview': args.preview,
+                   'time_budget': args.time_budget, 'manifest': manifest}
+        if args.jobs > 1:           # Plot the diagrams in parallel worker processes
+            print('Plotting ' + ', '.join(dc_keys))
+            with Profiler.stage('plot_dataflows', n_items=len(dc_keys)):
+                fingerprints = DataFlow.plot_dataflows(cawg_date, dc_keys, n_workers=args.jobs, **options)
+            manifest.update(fingerprints)
+        else:
+            from conduit import Conduit
+
+            conduit = Conduit(DataFlow.xy_origin, 0, (0, 0, 0))     # Grid reset and reused for each diagram
+            for dc_key in dc_keys:
+                print('Plotting ' + dc_key)
+                with Profiler.stage('plot_dataflow_' + dc_key):
+                    fingerprint = dataflow.plot_dataflow(cars, caps, kdps, cawg_date, kdp_id=dc_key,
+                                                         conduit=conduit, **options)
+                manifest[DataFlow.get_plot_name(dc_key, **options)] = fingerprint
+        DataFlow.write_manifest(manifest)
+
+    print("Building shift plan")
+    with Profiler.stage('read_staff') as stage:
+        plan = ShiftPlan()
+        stage['n_items'] = len(plan.staff)
+    n_staff = len(plan.staff)
+    with Profiler.stage('create_rota'):
+        rota = plan.create_rota()
+    with Profiler.stage('allocate_prescheduled', n_items=n_staff):
+        rota = plan.allocate_prescheduled(rota)
+    for task_type in ['CAP', 'KDP', 'CAR']:
+        with Profiler.stage('allocate_tasks_' + task_type, n_items=n_staff):
+            rota = plan.allocate_tasks(rota, task_type)
+    with Profiler.stage('allocate_remaining', n_items=n_staff):
+        rota = plan.allocate_remaining(rota)
+    if plots:
+        with Profiler.stage('plot_staff_schedules', n_items=n_staff):
+            plan.plot_staff_schedules(name='s4.png')
+            plan.plot_staff_schedules(name='s5.png')
+    with Profiler.stage('tidy_rota', n_items=rota.slots.size):
+        rota.tidy()
+    with Profiler.stage('test_rota', n_items=rota.slots.size):
+        plan.test_rota(rota.slots)
+    with Profiler.stage('build_analysis_rota', n_items=n_staff):
+        a_rota = plan.build_analysis_rota()
+        a_rota = plan.tidy_rota(a_rota)
+
+    if plots:
+        with Profiler.stage('plot_rota_analysis'):
+            plan.plot_rota(a_rota, 'analysis_rota', is_analysis=True)
+        with Profiler.stage('plot_staff_calendar', n_items=n_staff):
+            plan.plot_staff_schedules(name='staff_calendar.png', show_greyout=False)
+        with Profiler.stage('plot_rota_moc'):
+            plan.plot_rota(rota.slots, 'moc_rota')
+
+    with Profiler.stage('print_shift_plan', n_items=n_staff):
+        plan.print(to_csv=True)
+
+    if Profiler.enabled:
+        Profiler.write_report()
+    print('timeliner - finished')
+
+if __name__ == "__main__":
+    import argparse
+    from dataflow import DataFlow
+
+    parser = argparse.ArgumentParser(description='Build the MIRI commissioning schedule and shift plan.')
+    parser.add_argument('--no-plots', action='store_true',
+                        help="write the '.csv' outputs only, without plotting any figures")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of worker processes used to plot the dataflow diagrams')
+    parser.add_argument('--format', choices=DataFlow.formats, default='png',
+                        help='file format of the dataflow diagrams')
+    parser.add_argument('--dpi', type=float, default=None,
+                        help='resolution of the dataflow diagram PNG files')
+    parser.add_argument('--preview', action='store_true',
+                        help='plot low resolution dataflow diagrams, sized by the number of tasks shown')
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help='maximum time (sec) to render each dataflow diagram PNG (reduces the resolution)')
+    parser.add_argument('--replot', action='store_true',
+                        help='replot all dataflow diagrams, including those whose tasks are unchanged')
+    parser.add_argument('--profile', action='store_true',
+                        help="record the time, memory use and item count of each stage in 'outputs/profile.json'")
+    parser.add_argument('--stream', action='store_true',
+                        help='read the CAWG timeline line by line, for very large timelines')
+    main(parser.parse_args())
@@ -73,6 +73,26 @@ class Tools:
         is_dark = bright < cut_level
         return is_dark
 
+    @staticmethod
+    def read_lines(path, **kwargs):
+        """ Generator which yields the lines of a text file one at a time, with
+        the line feed removed.  Set n_header_lines to skip header lines and
+        drop_last=True to skip a final line which is not terminated by a line
+        feed (the same lines as text_block.split('\\n')[n_header_lines:-1]).
+        """
+        n_header_lines = kwargs.get('n_header_lines', 0)
+        drop_last = kwargs.get('drop_last', False)
+        with open(path, 'r') as file:
+            for i, line in enumerate(file):
+                if i < n_header_lines:
+                    continue
+                if line.endswith('\n'):
+                    line = line[:-1]
+                elif drop_last:
+                    return
+                yield line
+        return
+
     @staticmethod
     def filter_strcom(line):
         """ Filter commas from strings delimited by double quotes
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The timeliner modules import each other by name from the 'source' directory
+# (and car_utils imports 'source.car'), so put both directories on the path.
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in [root, os.path.join(root, 'source')]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
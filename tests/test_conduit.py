@@ -0,0 +1,41 @@
+from conduit import Conduit
+
+
+class FakeLoom:
+    def __init__(self, index):
+        self.index = index
+
+
+class FakeTask:
+    def __init__(self, row, col):
+        self.row, self.col = row, col
+
+
+def test_tracks_are_shared_by_a_loom_and_grow_when_full():
+    conduit = Conduit([0.0, 0.0], 2, (1, 1, 0))
+    conduit.build_cells()
+    task = FakeTask(1, 0)
+    ys = [conduit.get_wire(task, FakeLoom(i)) for i in range(0, Conduit.n_tracks + 1)]
+    assert len(set(ys)) == Conduit.n_tracks + 1         # One track each, including the extra one
+    assert conduit.get_wire(task, FakeLoom(3)) == ys[3]
+    assert conduit.wire_usage.shape[2] == 2 * Conduit.n_tracks
+    assert list(conduit.wire_usage[0, 1, 0:3]) == [0, 1, 2]
+
+
+def test_reset_frees_cells_and_tracks_for_the_next_diagram():
+    conduit = Conduit([0.0, 0.0], 3, (1, 1, 1))
+    conduit.build_cells()
+    conduit.cell_occupation[2, 2] = True
+    conduit.get_wire(FakeTask(0, 0), FakeLoom(7))
+    occupation = conduit.occupation
+
+    conduit.reset(2, (1, 1, 0))                         # Smaller grid reuses the arrays
+    assert conduit.occupation is occupation
+    assert conduit.cell_occupation.shape == (2, 2)
+    assert not conduit.occupation.any()
+    assert (conduit.wire_usage == -1).all() and not conduit.next_track.any()
+    assert conduit.wire_map == {}
+
+    conduit.reset(4, (2, 2, 1))                         # Larger grid reallocates them
+    assert conduit.cell_occupation.shape == (4, 5)
+    assert conduit.wire_usage.shape[1] == 5
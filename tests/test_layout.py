@@ -0,0 +1,66 @@
+from layout import Layout
+
+
+class FakeTask:
+    """ Minimal stand in for a Cap or Kdp, with just the attributes used by Layout. """
+    def __init__(self, name, sources=None):
+        self.name = name
+        self.sources = [] if sources is None else sources
+        self.row, self.col = None, None
+
+
+def names(layers):
+    return [[task.name for task in layer] for layer in layers]
+
+
+def test_layers_follow_longest_chain_of_sources():
+    a = FakeTask('a')
+    b = FakeTask('b', [a])
+    c = FakeTask('c', [a, b])
+    d = FakeTask('d')
+    assert names(Layout.get_layers([c, b, a, d])) == [['a', 'd'], ['b'], ['c']]
+
+
+def test_sources_outside_the_cap_list_are_ignored():
+    car = FakeTask('car')
+    a = FakeTask('a', [car])
+    b = FakeTask('b', [car, a])
+    assert names(Layout.get_layers([a, b])) == [['a'], ['b']]
+
+
+def test_loop_is_placed_in_a_final_layer(capsys):
+    a = FakeTask('a')
+    b = FakeTask('b')
+    c = FakeTask('c', [b])
+    b.sources = [a, c]                      # b and c feed each other
+    d = FakeTask('d', [c])
+    layers = Layout.get_layers([d, c, b, a])
+    assert names(layers) == [['a'], ['d', 'c', 'b']]
+    assert 'loop' in capsys.readouterr().out
+
+
+def test_place_layer_keeps_rows_in_source_order():
+    sources = [FakeTask('s' + str(row)) for row in range(0, 4)]
+    for row, source in enumerate(sources):
+        source.row, source.col = row, 0
+    placed = {id(source) for source in sources}
+    tasks = [FakeTask('t3', [sources[3]]), FakeTask('t0', [sources[0]]), FakeTask('t1', [sources[1], sources[2]])]
+    n_cols = Layout._place_layer(tasks, 4, 1, placed)
+    assert n_cols == 1
+    assert [(task.name, task.row, task.col) for task in tasks] == [('t3', 3, 1), ('t0', 0, 1), ('t1', 2, 1)]
+    assert all(id(task) in placed for task in tasks)
+
+
+def test_place_layer_spreads_a_full_layer_over_columns():
+    tasks = [FakeTask('t' + str(i)) for i in range(0, 5)]
+    n_cols = Layout._place_layer(tasks, 2, 3, set())
+    assert n_cols == 3
+    cells = {(task.row, task.col) for task in tasks}
+    assert len(cells) == 5                  # No two tasks share a cell
+    assert all(0 <= row < 2 and 3 <= col < 6 for row, col in cells)
+
+
+def test_car_columns_are_clamped():
+    assert Layout.get_car_cols(0) == 1
+    assert Layout.get_car_cols(8) == 2
+    assert Layout.get_car_cols(100000) == Layout.max_car_cols
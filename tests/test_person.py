@@ -0,0 +1,36 @@
+import numpy as np
+from person import Person
+
+
+def make_person(n_days):
+    """ A Person with just a free timetable (skipping the staff file). """
+    person = Person.__new__(Person)
+    person.timetable = np.full(n_days, Person.role_free, dtype=np.uint8)
+    person.role_counts = [0] * 256
+    person.role_counts[Person.role_free] = n_days
+    person.contiguously_allocated = 0
+    return person
+
+
+def test_set_role_counts_console_days():
+    person = make_person(10)
+    for day in [1, 2, 5]:
+        person.set_role(day, Person.role_console)
+    person.set_role(2, Person.role_sme_console)
+    person.set_role(5, Person.role_analyst)
+    assert person._get_allocated() == 2
+    assert person.role_counts[Person.role_analyst] == 1
+    assert person.role_counts[Person.role_free] == 7
+
+
+def test_set_role_tracks_the_console_block():
+    person = make_person(10)
+    for day in [2, 3, 5, 6, 7]:
+        person.set_role(day, Person.role_console)
+    assert person.contiguously_allocated == 3
+    assert person.get_block_length(4) == 6         # Day 4 would join the two blocks
+    person.set_role(4, Person.role_sme_console)
+    assert person.contiguously_allocated == 6
+    person.set_role(4, Person.role_free)
+    assert person.contiguously_allocated == 0
+    assert person.get_block_length(0) == 1
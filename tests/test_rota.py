@@ -0,0 +1,67 @@
+import numpy as np
+from rota import Rota
+from shift_plan import ShiftPlan
+
+
+def check_index(rota):
+    """ The index (n_filled, free_slots, staff_slots) must match the slots matrix. """
+    free = ShiftPlan.free
+    for day in range(0, rota.n_days):
+        column = rota.slots[:, day]
+        assert rota.n_filled[day] == np.count_nonzero(column != free)
+        assert sorted(rota.free_slots[day]) == list(np.flatnonzero(column == free))
+        for staff_idx in range(0, rota.staff_slots.shape[0]):
+            slot = rota.get_slot(staff_idx, day)
+            if slot is None:
+                assert staff_idx not in column
+            else:
+                assert column[slot] == staff_idx
+
+
+def test_insert_and_remove():
+    rota = Rota(3, 2, 5)
+    assert [rota.insert(staff_idx, 0) for staff_idx in [4, 2, 0]] == [0, 1, 2]
+    assert rota.insert(2, 0) == 1                   # Already in the rota
+    assert rota.remove(2, 0) == 1
+    assert rota.remove(2, 0) is None
+    assert rota.get_free_slot(0) == 1               # Freed slot is reused first
+    assert rota.insert(3, 0) == 1
+    check_index(rota)
+
+
+def test_rota_grows_when_a_day_is_full():
+    rota = Rota(2, 3, 6)
+    rota.insert(5, 2)
+    for staff_idx in range(0, 5):
+        rota.insert(staff_idx, 1)
+    assert rota.n_slots == 8
+    assert rota.slots.shape == (8, 3)
+    assert list(rota.slots[0:5, 1]) == [0, 1, 2, 3, 4]
+    assert rota.get_free_slot(2) == 1               # Existing free slot before the new ones
+    check_index(rota)
+
+
+def test_round_trip_after_growth():
+    rng = np.random.default_rng(1)
+    n_staff, n_days = 12, 5
+    rota = Rota(2, n_days, n_staff)
+    is_on = np.full((n_staff, n_days), False)
+    for step in range(0, 400):
+        staff_idx, day = int(rng.integers(0, n_staff)), int(rng.integers(0, n_days))
+        if is_on[staff_idx, day]:
+            rota.remove(staff_idx, day)
+        else:
+            rota.insert(staff_idx, day)
+        is_on[staff_idx, day] = not is_on[staff_idx, day]
+    assert rota.n_slots > 2
+    check_index(rota)
+
+    slots = rota.slots.copy()
+    rota.reindex()                                  # Rebuilding the index gives the same index
+    check_index(rota)
+    assert np.array_equal(rota.slots, slots)
+
+    rota.tidy()                                     # Index is rebuilt after the slots are moved
+    check_index(rota)
+    for day in range(0, n_days):
+        assert set(rota.slots[:, day]) - {ShiftPlan.free} == set(np.flatnonzero(is_on[:, day]))
@@ -0,0 +1,78 @@
+import numpy as np
+from person import Person
+from rota_validator import RotaValidator
+
+
+class FakePerson:
+    def __init__(self, index, **kwargs):
+        self.index = index
+        self.blackout_days = kwargs.get('blackout_days', [])
+        self.greyout_days = kwargs.get('greyout_days', [])
+        self.max_allocation = kwargs.get('max_allocation', 100)
+        self.max_contiguous_allocation = kwargs.get('max_contiguous_allocation', 100)
+
+
+class FakePlan:
+    """ The parts of a ShiftPlan read by RotaValidator. """
+    free = -1
+
+    def __init__(self, staff, n_days, quota):
+        self.staff = staff
+        self.start_md = -5
+        self.roles = np.full((len(staff), n_days), Person.role_free, dtype=np.uint8)
+        self.daily_slot_quota = np.full(n_days, quota)
+
+
+def make_rota(plan, n_slots):
+    """ Build a rota from the console days in the plan's role matrix. """
+    n_staff, n_days = plan.roles.shape
+    rota = np.full((n_slots, n_days), plan.free, dtype=np.int16)
+    for day in range(0, n_days):
+        staff_idxs = np.flatnonzero(plan.roles[:, day] == Person.role_console)
+        rota[0:len(staff_idxs), day] = staff_idxs
+    return rota
+
+
+def get_kinds(violations):
+    return sorted(str(kind) for kind in violations['kind'])
+
+
+def test_clean_rota_has_no_violations():
+    plan = FakePlan([FakePerson(0), FakePerson(1)], 10, 1)
+    plan.roles[0, 0:5] = Person.role_console
+    plan.roles[1, 5:10] = Person.role_console
+    counts, violations = RotaValidator(plan).validate(make_rota(plan, 2))
+    assert len(violations) == 0
+    assert list(counts['md']) == list(range(-5, 5))
+    assert list(counts['rota_console']) == [1] * 10
+
+
+def test_over_long_block_is_flagged():
+    plan = FakePlan([FakePerson(0, max_contiguous_allocation=3), FakePerson(1)], 12, 1)
+    plan.roles[0, 2:7] = Person.role_console        # Block of 5 days, limit 3
+    plan.roles[0, 8:11] = Person.role_console       # Block of 3 days is allowed
+    plan.roles[1, [0, 1, 7, 11]] = Person.role_console
+    counts, violations = RotaValidator(plan).validate(make_rota(plan, 2))
+    assert get_kinds(violations) == ['max_contiguous_allocation']
+    violation = violations[0]
+    assert (violation['staff'], violation['md'], violation['value'], violation['limit']) == (0, 2 - 5, 5, 3)
+
+
+def test_total_allocation_and_quota_are_flagged():
+    plan = FakePlan([FakePerson(0, max_allocation=3)], 6, 1)
+    plan.roles[0, [0, 1, 3, 4]] = Person.role_console
+    counts, violations = RotaValidator(plan).validate(make_rota(plan, 1))
+    assert get_kinds(violations) == ['max_allocation', 'quota', 'quota']
+    total = violations[violations['kind'] == 'max_allocation'][0]
+    assert (total['md'], total['value'], total['limit']) == (4 - 5, 4, 3)
+    quota = violations[violations['kind'] == 'quota']
+    assert list(quota['md']) == [2 - 5, 5 - 5]
+
+
+def test_blackout_and_greyout_days_are_flagged():
+    plan = FakePlan([FakePerson(0, blackout_days=[1], greyout_days=[2]), FakePerson(1)], 6, 1)
+    plan.roles[0, 0:3] = Person.role_console
+    plan.roles[1, 3:6] = Person.role_console
+    counts, violations = RotaValidator(plan).validate(make_rota(plan, 1))
+    assert get_kinds(violations) == ['blackout', 'greyout']
+    assert sorted(violations['md'] + 5) == [1, 2]
@@ -0,0 +1,73 @@
+import numpy as np
+from person import Person
+from shift_plan import ShiftPlan
+
+
+def make_plan(roles):
+    """ A ShiftPlan holding just a role matrix (skipping the staff file). """
+    plan = ShiftPlan.__new__(ShiftPlan)
+    plan.roles = np.array([[ord(role) for role in timetable] for timetable in roles], dtype=np.uint8)
+    plan.n_days = plan.roles.shape[1]
+    return plan
+
+
+def test_analysis_rota_lists_analysts_in_staff_order():
+    plan = make_plan(['aA.m',
+                      '.aaa',
+                      'a.KA'])
+    a_rota = plan.build_analysis_rota()
+    assert a_rota.dtype == np.int16
+    assert list(a_rota[0]) == [0, 0, 1, 1]
+    assert list(a_rota[1]) == [2, 1, ShiftPlan.free, 2]
+    assert np.all(a_rota[2:] == ShiftPlan.free)
+
+
+def test_analysis_rota_is_limited_to_fifteen_slots():
+    plan = make_plan(['a'] * 20)
+    a_rota = plan.build_analysis_rota()
+    assert list(a_rota[:, 0]) == list(range(0, 15))
+
+
+
+def make_rota(n_slots, n_days, n_staff, seed):
+    """ A rota with random people in random slots, each person on at most one slot a day. """
+    rng = np.random.default_rng(seed)
+    rota = np.full((n_slots, n_days), ShiftPlan.free, dtype=np.int16)
+    for day in range(0, n_days):
+        n_on = rng.integers(0, n_slots + 1)
+        staff_idxs = rng.choice(n_staff, size=min(n_on, n_staff), replace=False)
+        slots = rng.choice(n_slots, size=len(staff_idxs), replace=False)
+        rota[slots, day] = staff_idxs
+    return rota
+
+
+def get_day_sets(rota):
+    return [set(rota[:, day][rota[:, day] != ShiftPlan.free]) for day in range(0, rota.shape[1])]
+
+
+def test_tidy_rota_keeps_the_people_on_each_day():
+    for seed in range(0, 10):
+        rota = make_rota(6, 40, 9, seed)
+        day_sets = get_day_sets(rota)
+        ShiftPlan.tidy_rota(rota)
+        assert get_day_sets(rota) == day_sets
+
+
+def test_tidy_rota_puts_each_block_on_one_row():
+    for seed in range(0, 10):
+        rota = make_rota(6, 40, 9, seed)
+        ShiftPlan.tidy_rota(rota)
+        n_slots, n_days = rota.shape
+        for day in range(1, n_days):
+            for staff_idx in set(rota[:, day]) & set(rota[:, day - 1]) - {ShiftPlan.free}:
+                assert list(rota[:, day]).index(staff_idx) == list(rota[:, day - 1]).index(staff_idx)
+
+
+def test_tidy_rota_fills_from_the_top_row():
+    rota = np.full((3, 4), ShiftPlan.free, dtype=np.int16)
+    rota[2, 0:2] = 5
+    rota[1, 1:4] = 7
+    ShiftPlan.tidy_rota(rota)
+    assert list(rota[0]) == [5, 5, ShiftPlan.free, ShiftPlan.free]
+    assert list(rota[1]) == [ShiftPlan.free, 7, 7, 7]
+    assert np.all(rota[2] == ShiftPlan.free)
@@ -0,0 +1,22 @@
+import numpy as np
+from timeline_compare import TimelineCompare
+
+
+def test_version_names_line_up_with_their_columns(tmp_path):
+    names = ['June', 'September', 'November', 'Flight', 'Next']
+    n = len(names)
+    dtype = [('ng_id', 'U10'), ('idt_id', 'U12'), ('t_start', 'f8', (n,)), ('d_start', 'f8', (n,)),
+             ('t_dur', 'f8', (n,)), ('d_dur', 'f8', (n,))]
+    diff = np.zeros(1, dtype=dtype)
+    diff['ng_id'], diff['idt_id'] = '74.1', 'MIR-005.1'
+    diff['t_start'][0, 1] = np.nan
+    path = tmp_path / 'compare.csv'
+    TimelineCompare.write_csv(names, diff, path=str(path))
+
+    names_line, hdr, line = path.read_text().splitlines()
+    assert len(names_line.rstrip()) <= len(hdr) and len(hdr) == len(line)
+    for v, name in enumerate(names):
+        col = 23 + 44 * v + 1                       # First character of this version's columns
+        assert names_line[col:col + len(name)] == name
+        assert hdr[col - 1] == ',' and line[col - 1] == ','
+        assert hdr[col:col + 10].strip() == 'L+day'